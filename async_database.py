@@ -0,0 +1,105 @@
+"""
+Asynchronous facade over Database.
+One worker thread makes every call, in the order they were submitted, so
+the GUI thread never waits on SQLite. Each call returns a future, and an
+optional callback is handed back to the caller's thread when it finishes.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """Runs Database calls on a single worker thread and returns futures."""
+
+    def __init__(self, db=None, dispatch=None):
+        """Wrap db; the plain Database stays usable for synchronous callers.
+
+        db may be None, and then open() builds it on the worker.
+
+        dispatch(callback, *result) is called on the worker once a call
+        succeeds and must arrange for callback(*result) to run on the
+        caller's thread, e.g. through the caller's event loop; it must not
+        block. Here result is always the single return value of the call.
+        Without dispatch, callbacks run on the worker.
+        """
+        self.db = db
+        self.dispatch = dispatch
+        self.closing = False  # Set by close(); callbacks are dropped from then on
+        # One worker keeps calls in submission order, so a read queued after
+        # a write always sees it
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        self.local = threading.local()  # local.on_worker is True on the worker thread
+
+    def submit(self, func, *args, callback=None, **kwargs):
+        """Queue func(*args, **kwargs) and return a Future for its result.
+
+        func is normally a bound method of self.db, or a small function
+        making several calls that should run back to back. callback(result)
+        is dispatched once the call succeeds. Failures are left on the future
+        for its consumer to report, and callback is not called.
+        """
+        queued = time.perf_counter()
+
+        def call():
+            if tracer.enabled:
+                tracer.record("database.queue_wait", time.perf_counter() - queued)
+            self.local.on_worker = True
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                # Often expected, e.g. IntegrityError for a taken username,
+                # so only traced here
+                logger.debug("Database call %s failed", getattr(func, '__name__', func), exc_info=True)
+                raise
+            # Dispatch before returning so that future.result() implies the
+            # callback has already been handed over
+            if callback is not None and not self.closing:
+                if self.dispatch is not None:
+                    self.dispatch(callback, result)
+                else:
+                    callback(result)
+            return result
+
+        return self.executor.submit(call)
+
+    def open(self, factory, callback=None):
+        """Build the database on the worker with factory() and use it from then on.
+
+        Opening a file runs PRAGMAs and migrations and may wait out another
+        process's lock, so it belongs on the worker too. Calls queued after
+        this one see the new database in self.db. Returns the future.
+        """
+        def attach():
+            self.db = factory()
+            return self.db
+
+        return self.submit(attach, callback=callback)
+
+    def call(self, func, *args, **kwargs):
+        """Run func on the worker, behind anything already queued, and wait for it.
+
+        Called from the worker itself, func just runs, rather than waiting
+        on a queue that can't move.
+        """
+        if getattr(self.local, 'on_worker', False):
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self):
+        """Finish the queued calls, stop the worker and close the database.
+
+        Callbacks of calls still queued are dropped: the caller's event loop
+        has usually stopped by now, and Tk can't take calls from other
+        threads then. The calls themselves still run, so no write is lost.
+        """
+        self.closing = True
+        self.executor.shutdown(wait=True)
+        if self.db is not None:
+            self.db.close()
@@ -3,18 +3,89 @@ User authentication manager for login, registration, and session management.
 Handles password validation and user session state.
 """
 
+import hashlib
+import os
+import secrets
 import sqlite3
-from database import Database
+import time
+from concurrent.futures import ThreadPoolExecutor
+from database import Database, open_storage
+from instrumentation import traced
+from models import User
+
+
+SESSION_FILE = ".pomodoro_session"  # Holds the remember-me token between launches
+SESSION_LIFETIME = 30 * 24 * 60 * 60  # Seconds a remember-me token stays valid
+
+
+def hash_token(token):
+    """Fast one-way hash for session tokens; they are random, so no bcrypt needed."""
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class AuthManager:
     """Manages user authentication including login, registration, and logout."""
 
-    def __init__(self):
-        """Initialize authentication manager with database connection."""
-        self.db = Database()
+    def __init__(self, db=None, bcrypt_rounds=None, session_file=SESSION_FILE, worker=None):
+        """Initialize authentication manager with database connection.
+
+        Without db, the storage named by $POMODORO_STORAGE is opened.
+        bcrypt_rounds overrides the database's password hashing cost.
+        session_file is where a remember-me token is kept between launches.
+        worker, an AsyncDatabase over db, makes every SQL call when given,
+        so only its thread touches the connection; bcrypt still runs on the
+        calling thread or the auth pool.
+        """
+        self.db = db if db is not None else Database(storage=open_storage())
+        if bcrypt_rounds is not None:
+            self.db.bcrypt_rounds = bcrypt_rounds
         self.current_user = None
+        self.session_file = session_file
+        self.worker = worker
+        self.session_token_hash = None  # Hash of this login's remember-me token, if any
+        self.executor = None  # Worker pool for bcrypt, created on first async call
+
+    def run_async(self, func, args, callback, dispatch):
+        """Run func(*args) on the worker pool and hand its result to callback.
+
+        func returns a (success, message) tuple. dispatch(callback, success,
+        message) is then called on the pool thread and must arrange for
+        callback(success, message) to run on the caller's thread, as for
+        AsyncDatabase. An exception becomes (False, "Error: ...").
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="auth")
+
+        def deliver(future):
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = (False, f"Error: {exc}")
+            dispatch(callback, *result)
+
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(deliver)
+        return future
+
+    def run_sql(self, func, *args):
+        """Make a Database call, on the worker if there is one, and return its result."""
+        if self.worker is None:
+            return func(*args)
+        return self.worker.call(func, *args)
 
+    def register_async(self, username, password, confirm_password, callback, dispatch):
+        """Register off the calling thread; callback receives (success, message)."""
+        return self.run_async(self.register, (username, password, confirm_password), callback, dispatch)
+
+    def login_async(self, username, password, callback, dispatch, remember=False):
+        """Log in off the calling thread; callback receives (success, message)."""
+        return self.run_async(self.login, (username, password, remember), callback, dispatch)
+
+    def resume_session_async(self, callback, dispatch):
+        """Resume a saved session off the calling thread; callback receives (success, message)."""
+        return self.run_async(self.resume_session, (), callback, dispatch)
+
+    @traced("auth.register")
     def register(self, username, password, confirm_password):
         """Register a new user with password confirmation and validation."""
         if password != confirm_password:
@@ -24,24 +95,73 @@ class AuthManager:
             return False, "Password must be at least 6 characters"
 
         try:
-            self.db.add_user(username, password)
+            self.db.add_user(username, password, run=self.run_sql)
             return True, "Registration successful!"
         except sqlite3.IntegrityError:
             return False, "Username already exists"
 
-    def login(self, username, password):
-        """Authenticate user and create session if credentials are valid."""
-        user = self.db.verify_user(username, password)
+    @traced("auth.login")
+    def login(self, username, password, remember=False):
+        """Authenticate user and create session if credentials are valid.
+
+        With remember=True a session token is saved so the next launch can
+        log in through resume_session() without checking the password.
+        """
+        user = self.db.verify_user(username, password, run=self.run_sql)
         if user:
-            self.current_user = {
-                'id': user[0],
-                'username': username
-            }
+            self.current_user = User(user[0], username)
+            if remember:
+                self.remember_session()
             return True, "Login successful!"
         return False, "Invalid username or password"
 
+    def remember_session(self):
+        """Create a remember-me token for the current user and save it locally."""
+        token = secrets.token_urlsafe(32)
+        token_hash = hash_token(token)
+        self.run_sql(self.db.prune_sessions)
+        self.run_sql(self.db.create_session, self.current_user.id, token_hash, time.time() + SESSION_LIFETIME)
+        # Owner-only permissions; the token is as good as a password until it expires
+        fd = os.open(self.session_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as file:
+            file.write(token)
+        self.session_token_hash = token_hash
+
+    @traced("auth.resume_session")
+    def resume_session(self):
+        """Log in from a saved remember-me token; returns (success, message)."""
+        try:
+            with open(self.session_file) as file:
+                token = file.read().strip()
+        except OSError:
+            return False, "No saved session"
+
+        token_hash = hash_token(token)
+        user = self.run_sql(self.db.get_session_user, token_hash)
+        if not user:
+            self.forget_session_file()
+            return False, "Saved session expired"
+        self.current_user = User(user[0], user[1])
+        self.session_token_hash = token_hash
+        return True, "Welcome back!"
+
+    def forget_session_file(self):
+        """Delete the local token file if there is one."""
+        try:
+            os.remove(self.session_file)
+        except OSError:
+            pass
+
     def logout(self):
-        """End the current user session."""
+        """End the current user session, revoking its remember-me token."""
+        if self.session_token_hash is not None:
+            if self.worker is not None:
+                # Queued, not awaited: logout runs on the GUI thread
+                self.worker.submit(self.db.revoke_session, self.session_token_hash)
+            else:
+                self.db.revoke_session(self.session_token_hash)
+            self.forget_session_file()
+            self.session_token_hash = None
         self.current_user = None
         return True, "Logged out successfully"
 
@@ -51,4 +171,4 @@ class AuthManager:
 
     def get_current_user_id(self):
         """Get the ID of the currently logged in user."""
-        return self.current_user['id'] if self.current_user else None
\ No newline at end of file
+        return self.current_user.id if self.current_user else None
\ No newline at end of file
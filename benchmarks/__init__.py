@@ -0,0 +1,4 @@
+"""
+Headless benchmarks for the database, auth, timer and rendering paths.
+Run from the repository root with `python -m benchmarks.run`.
+"""
@@ -0,0 +1,21 @@
+"""
+AuthManager.login latency for each bcrypt cost.
+"""
+
+from auth import AuthManager
+from benchmarks.common import measure, result, temp_database
+
+COSTS = [4, 8, 10, 12]
+QUICK_COSTS = [4, 8]
+
+
+def run(quick=False):
+    """Return the median login time at each cost."""
+    results = []
+    for cost in QUICK_COSTS if quick else COSTS:
+        with temp_database(bcrypt_rounds=cost) as db:
+            auth = AuthManager(db)
+            auth.register("bench", "benchmark", "benchmark")
+            latency = measure(lambda: auth.login("bench", "benchmark"), repeat=3 if cost >= 12 else 5)
+            results.append(result(f"auth.login.cost{cost}", latency))
+    return results
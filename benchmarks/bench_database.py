@@ -0,0 +1,49 @@
+"""
+Database throughput at different table sizes.
+The table is filled in bulk, then single-row operations are timed for one
+user who owns a small slice of it.
+"""
+
+import itertools
+
+from benchmarks.common import measure, result, temp_database
+
+SIZES = [1000, 100000, 1000000]
+QUICK_SIZES = [1000, 10000]
+USERS_PER_THOUSAND = 1  # One user per thousand rows, so each owns ~1k tasks
+OPS = 500
+
+
+def fill(db, rows):
+    """Insert `rows` tasks spread over rows // 1000 users."""
+    users = max(1, rows // 1000 * USERS_PER_THOUSAND)
+    per_user = rows // users
+    for user_id in range(1, users + 1):
+        db.add_tasks(user_id, ((f"Task {i} for user {user_id}", i % 3 == 0, i % 5)
+                               for i in range(per_user)))
+    return users
+
+
+def run(quick=False):
+    """Return results for add_task, get_user_tasks and increment_pomodoro at each size."""
+    results = []
+    for size in QUICK_SIZES if quick else SIZES:
+        with temp_database() as db:
+            users = fill(db, size)
+            user_id = users // 2 + 1
+
+            counter = itertools.count()
+            add = measure(lambda: db.add_task(user_id, f"New task {next(counter)}"), repeat=3, number=OPS)
+            results.append(result(f"database.add_task.{size}", add))
+
+            task_ids = [task.id for task in db.get_user_tasks(user_id)]
+            ids = itertools.cycle(task_ids)
+            increment = measure(lambda: db.increment_pomodoro(next(ids)), repeat=3, number=OPS)
+            results.append(result(f"database.increment_pomodoro.{size}", increment))
+
+            load = measure(lambda: db.get_user_tasks(user_id), repeat=5, number=10)
+            results.append(result(f"database.get_user_tasks.{size}", load))
+
+            page = measure(lambda: db.get_task_page(user_id), repeat=5, number=20)
+            results.append(result(f"database.get_task_page.{size}", page))
+    return results
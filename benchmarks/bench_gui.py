@@ -0,0 +1,65 @@
+"""
+PomodoroApp.load_tasks render time for N tasks.
+Needs a display; run the suite under a virtual one, e.g. `xvfb-run python -m
+benchmarks.run`. Skipped when no display is available.
+"""
+
+import os
+import sys
+
+from benchmarks.common import measure, result, temp_database
+from models import User
+from task_cache import CachedDatabase
+
+SIZES = [100, 1000, 10000]
+QUICK_SIZES = [100, 1000]
+
+
+def run(quick=False):
+    """Return first-render and incremental re-render times at each size."""
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        print("[bench] Skipping GUI benchmarks: no DISPLAY (try xvfb-run)", file=sys.stderr)
+        return []
+
+    from gui import PomodoroApp
+
+    results = []
+    for size in QUICK_SIZES if quick else SIZES:
+        with temp_database(CachedDatabase) as db:
+            db.add_tasks(1, ((f"Task {i}", 0, 0) for i in range(size)))
+            app = PomodoroApp(db)
+            app.open_database()
+            # The main loop isn't running, so Tk can't take root.after() from
+            # the worker: queue its callbacks and run them here instead
+            callbacks = []
+            app.db_worker.dispatch = lambda func, *args: callbacks.append((func, args))
+
+            def wait(future):
+                # A finished future has already queued its callback
+                future.result()
+                while callbacks:
+                    func, args = callbacks.pop(0)
+                    func(*args)
+                app.root.update()
+
+            app.auth.current_user = User(1, 'bench')
+            app.show_main_app()
+            wait(app.load_tasks())
+
+            def first_render():
+                app.reset_task_rows()
+                app.tasks = []
+                wait(app.load_tasks())
+
+            results.append(result(f"gui.load_tasks.first.{size}", measure(first_render, repeat=3)))
+
+            task_id = app.tasks[0].id
+
+            def rerender():
+                db.increment_pomodoro(task_id)
+                wait(app.load_tasks())
+
+            results.append(result(f"gui.load_tasks.update.{size}", measure(rerender, repeat=5)))
+            app.quit()
+            app.db_worker.close()
+    return results
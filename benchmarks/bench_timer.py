@@ -0,0 +1,41 @@
+"""
+PomodoroTimer drift and tick cost over a simulated long session.
+A fake clock adds random scheduling latency to every wake-up; with deadline
+based timing the session should still end within one wake-up of its deadline.
+"""
+
+import random
+import time
+
+from benchmarks.common import result
+from pomodoro_timer import PomodoroTimer
+
+SESSION = 4 * 60 * 60  # Four hours of work time
+MAX_LATENCY = 0.05  # Worst simulated lateness of a wake-up, in seconds
+
+
+def run(quick=False):
+    """Return end-of-session drift and CPU time per tick."""
+    session = SESSION // 8 if quick else SESSION
+    rng = random.Random(1)
+    now = [0.0]
+    # A no-op after() keeps start() from launching a real tick thread
+    timer = PomodoroTimer(clock=lambda: now[0], after=lambda *args: None)
+    timer.work_time = session
+    timer.reset()
+    ticks = [0]
+    timer.set_callback(lambda *args: ticks.__setitem__(0, ticks[0] + 1))
+
+    start = time.perf_counter()
+    timer.start()
+    while True:
+        delay = timer.tick()
+        if delay is None:
+            break
+        now[0] += delay + rng.uniform(0, MAX_LATENCY)
+    elapsed = time.perf_counter() - start
+
+    return [
+        result("timer.drift", abs(now[0] - session)),
+        result("timer.tick_cost", elapsed / max(1, ticks[0])),
+    ]
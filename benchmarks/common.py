@@ -0,0 +1,40 @@
+"""
+Timing helpers shared by the benchmark modules.
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from database import ConnectionManager, Database
+
+
+def measure(func, repeat=5, number=1):
+    """Return the median seconds per call of func over `repeat` runs of `number` calls."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples)
+
+
+def result(name, value, unit="s"):
+    """Build one benchmark result; every metric is lower-is-better."""
+    return {'name': name, 'value': value, 'unit': unit}
+
+
+@contextmanager
+def temp_database(database_class=Database, **kwargs):
+    """Yield a Database on a fresh file in a temporary directory."""
+    directory = tempfile.mkdtemp(prefix="pomodoro-bench-")
+    path = os.path.join(directory, "bench.db")
+    try:
+        yield database_class(path, **kwargs)
+    finally:
+        ConnectionManager.close(path)
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,93 @@
+"""
+Run the benchmark suite, write the results as JSON and optionally compare
+them with a stored baseline.
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sqlite3
+import sys
+
+from benchmarks import bench_auth, bench_database, bench_gui, bench_timer
+
+SUITES = {
+    'database': bench_database,
+    'auth': bench_auth,
+    'timer': bench_timer,
+    'gui': bench_gui,
+}
+
+
+def run_suites(names, quick=False):
+    """Run the named suites and return the report dict."""
+    results = {}
+    for name in names:
+        print(f"[bench] {name}", file=sys.stderr)
+        for item in SUITES[name].run(quick=quick):
+            results[item['name']] = {'value': item['value'], 'unit': item['unit']}
+            print(f"[bench]   {item['name']}: {item['value']:.6g} {item['unit']}", file=sys.stderr)
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Return the names of results slower than baseline by more than threshold (a fraction)."""
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or previous['value'] <= 0:
+            continue
+        ratio = current['value'] / previous['value']
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            print(f"[bench] REGRESSION {name}: {previous['value']:.6g} -> {current['value']:.6g} "
+                  f"({ratio:.2f}x)", file=sys.stderr)
+    return regressions
+
+
+def main():
+    """Command line entry point; exits non-zero on a regression."""
+    parser = argparse.ArgumentParser(description="Pomodoro benchmark suite")
+    parser.add_argument('suites', nargs='*',
+                        help=f"suites to run: {', '.join(SUITES)} (default: all)")
+    parser.add_argument('--output', help="write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', help="results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed slowdown over baseline, as a fraction (default: 0.2)")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes for a fast run")
+    args = parser.parse_args()
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite: {', '.join(unknown)}")
+
+    report = run_suites(args.suites or list(SUITES), quick=args.quick)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
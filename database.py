@@ -1,98 +1,1098 @@
 """
 Database operations for storing users, tasks, and authentication data.
-Uses SQLite for local storage and bcrypt for password security.
+Uses SQLite for local storage and bcrypt (loaded on first use) for password security.
+All Database instances for the same file share one tuned connection.
+A storage object decides which file holds which rows: one file, per-user
+shards beside a directory database, or a private in-memory database.
 """
 
+import atexit
+import datetime
+from contextlib import contextmanager
+import os
 import sqlite3
-import bcrypt
+import threading
+import time
+
+from instrumentation import traced
+from models import Task, TaskList
+
+
+# Bump SCHEMA_VERSION and append to MIGRATIONS whenever the schema changes.
+# The database records the version it is at in PRAGMA user_version, so a
+# current database runs no DDL at all on startup.
+SCHEMA_VERSION = 8
+
+MIGRATIONS = {
+    1: [
+        # Users table stores user credentials with hashed passwords
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL
+        )
+        ''',
+        # Tasks table stores todo items linked to users
+        '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            completed INTEGER DEFAULT 0,
+            pomodoro_count INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        # Task lists are always loaded per user, optionally by completion
+        'CREATE INDEX IF NOT EXISTS idx_tasks_user_completed ON tasks(user_id, completed)',
+    ],
+    2: [
+        # Append-only log of every finished work or break session
+        '''
+        CREATE TABLE IF NOT EXISTS pomodoro_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            task_id INTEGER,
+            session_type TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            ended_at REAL NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_user_ended ON pomodoro_sessions(user_id, ended_at)',
+        # Rollups kept up to date on every insert so stats are single lookups
+        '''
+        CREATE TABLE IF NOT EXISTS user_daily_stats (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            work_sessions INTEGER NOT NULL DEFAULT 0,
+            work_seconds INTEGER NOT NULL DEFAULT 0,
+            break_sessions INTEGER NOT NULL DEFAULT 0,
+            break_seconds INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_weekly_stats (
+            user_id INTEGER NOT NULL,
+            week TEXT NOT NULL,
+            work_sessions INTEGER NOT NULL DEFAULT 0,
+            work_seconds INTEGER NOT NULL DEFAULT 0,
+            break_sessions INTEGER NOT NULL DEFAULT 0,
+            break_seconds INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, week)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS task_stats (
+            task_id INTEGER PRIMARY KEY,
+            work_sessions INTEGER NOT NULL DEFAULT 0,
+            work_seconds INTEGER NOT NULL DEFAULT 0,
+            last_session_at REAL
+        )
+        ''',
+        # Consecutive days with at least one work session
+        '''
+        CREATE TABLE IF NOT EXISTS user_streaks (
+            user_id INTEGER PRIMARY KEY,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            longest_streak INTEGER NOT NULL DEFAULT 0,
+            last_day TEXT
+        )
+        ''',
+    ],
+    3: [
+        # Keyset pages ordered by pomodoro count walk this index directly
+        'CREATE INDEX IF NOT EXISTS idx_tasks_user_pomodoros ON tasks(user_id, pomodoro_count DESC, id)',
+    ],
+    4: [
+        # Full-text index over task titles. The owner column holds a "u<id>"
+        # token so a search only walks the searching user's postings. It is
+        # contentless: matches are joined back to tasks by rowid.
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, owner, content='', prefix='2 3',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, owner) VALUES (new.id, new.title, 'u' || new.user_id);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, owner)
+            VALUES ('delete', old.id, old.title, 'u' || old.user_id);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, user_id ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, owner)
+            VALUES ('delete', old.id, old.title, 'u' || old.user_id);
+            INSERT INTO tasks_fts (rowid, title, owner) VALUES (new.id, new.title, 'u' || new.user_id);
+        END
+        ''',
+        # Backfill tasks created before the index existed
+        "INSERT INTO tasks_fts (rowid, title, owner) SELECT id, title, 'u' || user_id FROM tasks",
+    ],
+    5: [
+        # "Remember me" sessions; only a SHA-256 of each token is stored
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            revoked INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)',
+    ],
+    6: [
+        # Change tracking for readers holding tasks in memory. Every write to
+        # a user's tasks bumps that user's revision and stamps the task in
+        # task_changes, so a reader can fetch just what changed since the
+        # revision it last saw. A stamped task missing from tasks was deleted.
+        '''
+        CREATE TABLE IF NOT EXISTS task_revisions (
+            user_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS task_changes (
+            task_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_task_changes_user ON task_changes(user_id, revision)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_revisions (user_id, revision) VALUES (new.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+            INSERT OR REPLACE INTO task_changes (task_id, user_id, revision)
+                SELECT new.id, new.user_id, revision FROM task_revisions WHERE user_id = new.user_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_update
+        AFTER UPDATE OF title, completed, pomodoro_count ON tasks BEGIN
+            INSERT INTO task_revisions (user_id, revision) VALUES (new.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+            INSERT OR REPLACE INTO task_changes (task_id, user_id, revision)
+                SELECT new.id, new.user_id, revision FROM task_revisions WHERE user_id = new.user_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_revisions (user_id, revision) VALUES (old.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+            INSERT OR REPLACE INTO task_changes (task_id, user_id, revision)
+                SELECT old.id, old.user_id, revision FROM task_revisions WHERE user_id = old.user_id;
+        END
+        ''',
+    ],
+    7: [
+        # Last checkpoint of each user's timer, rewritten on start, pause,
+        # reset and session switches only. deadline is the wall-clock end of
+        # a running session and NULL while stopped.
+        '''
+        CREATE TABLE IF NOT EXISTS timer_state (
+            user_id INTEGER PRIMARY KEY,
+            is_work_session INTEGER NOT NULL,
+            remaining REAL NOT NULL,
+            deadline REAL,
+            task_id INTEGER,
+            updated_at REAL NOT NULL
+        )
+        ''',
+    ],
+    8: [
+        # Unfiltered pages in id order walk this index; the others cover
+        # only filtered or pomodoro-ordered pages, which left these to sort
+        # all of the user's tasks on every page
+        'CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id, id)',
+    ],
+}
+
+TASK_PAGE_SIZE = 100
+SEARCH_LIMIT = 50
+
+# Connection tuning applied once when the shared connection is opened
+PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',   # Safe with WAL, avoids an fsync per commit
+    'PRAGMA cache_size = -16000',    # 16 MB page cache
+    'PRAGMA mmap_size = 268435456',  # 256 MB memory-mapped reads
+    'PRAGMA temp_store = MEMORY',
+]
+
+BUSY_TIMEOUT = 5.0  # Seconds to wait on a lock held by another process
+CACHED_STATEMENTS = 256
+
+# bcrypt work factor for new hashes; stored hashes with a different cost are
+# rehashed on the next successful login
+BCRYPT_ROUNDS = 12
+
+SESSION_PRUNE_BATCH = 500  # Expired sessions deleted per statement
+
+# Storage used when none is configured; see open_storage()
+STORAGE_ENV = "POMODORO_STORAGE"
+DEFAULT_STORAGE = "pomodoro.db"
+DEFAULT_SHARDS = 16
+# Task ids in shard n start at n << SHARD_ID_BITS, so an id names its shard
+SHARD_ID_BITS = 40
+
+# Write-behind defaults: pending writes are committed together after this
+# many seconds or once this many have piled up, whichever comes first
+FLUSH_INTERVAL = 0.25
+FLUSH_THRESHOLD = 500
+
+
+@traced("bcrypt.hashpw")
+def hash_password(password, rounds):
+    """Hash a password with bcrypt at the given cost."""
+    # bcrypt is imported on first use to keep it off the startup path
+    import bcrypt
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
+
+
+@traced("bcrypt.checkpw")
+def check_password(password, password_hash):
+    """Check a password against a stored bcrypt hash."""
+    import bcrypt
+    return bcrypt.checkpw(password.encode(), password_hash)
+
+
+def call_directly(func, *args):
+    """Default for the run= parameter of Database methods: just call func(*args)."""
+    return func(*args)
+
+
+class SharedConnection(sqlite3.Connection):
+    """sqlite3 connection carrying the lock that serializes its commits."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+
+
+class ConnectionManager:
+    """Hands out one shared, tuned connection per database file."""
+
+    _connections = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db_name="pomodoro.db"):
+        """Return the shared connection for db_name, opening it on first use."""
+        with cls._lock:
+            conn = cls._connections.get(db_name)
+            if conn is None:
+                conn = cls.open(db_name)
+                cls._connections[db_name] = conn
+            return conn
+
+    @classmethod
+    def open(cls, db_name):
+        """Open, tune and migrate a new connection."""
+        # SQL text below is kept constant so the statement cache can reuse
+        # the prepared statements across calls
+        # Background flushes commit from another thread, guarded by conn.lock
+        conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT,
+                               cached_statements=CACHED_STATEMENTS,
+                               factory=SharedConnection, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        cls.migrate(conn)
+        return conn
+
+    @classmethod
+    def migrate(cls, conn):
+        """Bring the schema up to SCHEMA_VERSION, skipping work if already current."""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        # sqlite3 doesn't open a transaction for DDL by itself. Take the write
+        # lock explicitly so the steps apply atomically, and re-read the
+        # version under it in case another process migrated meanwhile.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for target in range(version + 1, SCHEMA_VERSION + 1):
+                for statement in MIGRATIONS[target]:
+                    conn.execute(statement)
+            if version < SCHEMA_VERSION:
+                # PRAGMA doesn't accept parameters; the value is our own integer
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    @classmethod
+    def close(cls, db_name=None):
+        """Close one shared connection, or all of them."""
+        with cls._lock:
+            names = [db_name] if db_name else list(cls._connections)
+            for name in names:
+                conn = cls._connections.pop(name, None)
+                if conn is not None:
+                    conn.close()
+
+
+class Storage:
+    """Decides which connection holds which rows for a Database.
+
+    Users and remember-me sessions live on the directory connection. A
+    user's tasks, session log and stats live together on the connection
+    returned by for_user(); for_task() finds the same connection from a
+    task id. This base class keeps everything on one connection.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = conn.lock  # Serializes group commits
+
+    def directory(self):
+        """Connection holding users and sessions."""
+        return self.conn
+
+    def for_user(self, user_id):
+        """Connection holding the user's tasks, session log and stats."""
+        return self.conn
+
+    def for_task(self, task_id):
+        """Connection holding the task."""
+        return self.conn
+
+    def connections(self):
+        """Every connection opened so far."""
+        return [self.conn]
+
+
+class FileStorage(Storage):
+    """Everything in one SQLite file, on the shared connection for that file."""
+
+    def __init__(self, db_name="pomodoro.db"):
+        super().__init__(ConnectionManager.get(db_name))
+        self.db_name = db_name
+
+
+class MemoryStorage(Storage):
+    """A private in-memory SQLite database, for tests and benchmarks.
+
+    Nothing touches the disk and nothing is shared: each instance starts
+    empty and its data is gone once it is garbage collected.
+    """
+
+    def __init__(self):
+        conn = sqlite3.connect(':memory:', cached_statements=CACHED_STATEMENTS,
+                               factory=SharedConnection, check_same_thread=False)
+        ConnectionManager.migrate(conn)
+        super().__init__(conn)
+
+
+class ShardedStorage(Storage):
+    """Users in a directory database and everyone's tasks spread over shard files.
+
+    Each user's tasks, session log and stats go to shard user_id % shards,
+    so writers for different users mostly take different file locks. Shards
+    are opened on first use. The shard count must stay the same once data
+    has been written.
+    """
+
+    def __init__(self, path, shards=DEFAULT_SHARDS):
+        """Keep the directory database and shards in the directory path."""
+        os.makedirs(path, exist_ok=True)
+        # Group commits span several connections. They are serialized by the
+        # directory connection's lock, which every storage opened on this
+        # directory shares along with the connections themselves.
+        super().__init__(ConnectionManager.get(os.path.join(path, "directory.db")))
+        self.path = path
+        self.shard_count = shards
+        self.shards = {}  # shard index -> connection
+
+    def shard(self, index):
+        """Connection for shard index, opening it on first use."""
+        conn = self.shards.get(index)
+        if conn is not None:
+            return conn
+        with self.lock:
+            conn = self.shards.get(index)
+            if conn is None:
+                conn = ConnectionManager.get(os.path.join(self.path, f"tasks-{index:03d}.db"))
+                # Start this shard's AUTOINCREMENT ids in its own range
+                conn.execute('''
+                    INSERT INTO sqlite_sequence (name, seq)
+                    SELECT 'tasks', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'tasks')
+                ''', (index << SHARD_ID_BITS,))
+                conn.commit()
+                self.shards[index] = conn
+        return conn
+
+    def for_user(self, user_id):
+        """Connection of the shard holding the user's data."""
+        return self.shard(user_id % self.shard_count)
+
+    def for_task(self, task_id):
+        """Connection of the shard whose id range holds task_id."""
+        return self.shard((task_id >> SHARD_ID_BITS) % self.shard_count)
+
+    def connections(self):
+        """The directory connection and every shard opened so far."""
+        return [self.conn] + list(self.shards.values())
+
+
+def open_storage(spec=None):
+    """Open the storage named by spec, or by $POMODORO_STORAGE when spec is None.
+
+    spec is "memory", "sharded:DIRECTORY" or "sharded:DIRECTORY,SHARDS",
+    or a file path, optionally written "file:PATH".
+    """
+    if spec is None:
+        spec = os.environ.get(STORAGE_ENV) or DEFAULT_STORAGE
+    kind, _, target = spec.partition(':')
+    if spec == "memory":
+        return MemoryStorage()
+    if kind == "sharded" and target:
+        path, _, shards = target.rpartition(',')
+        if path and shards.isdigit():
+            return ShardedStorage(path, int(shards))
+        return ShardedStorage(target)
+    if kind == "file" and target:
+        return FileStorage(target)
+    return FileStorage(spec)
 
 
 class Database:
     """Handles all database operations including user management and task storage."""
 
-    def __init__(self, db_name="pomodoro.db"):
-        """Initialize database connection and create tables if they don't exist."""
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()
+    def __init__(self, db_name="pomodoro.db", write_behind=False,
+                 flush_interval=FLUSH_INTERVAL, flush_threshold=FLUSH_THRESHOLD,
+                 bcrypt_rounds=BCRYPT_ROUNDS, storage=None):
+        """Attach to the shared connection for db_name, creating tables if needed.
+
+        storage, if given, replaces db_name: any Storage, e.g. from
+        open_storage(), decides where rows are kept.
+
+        With write_behind=True mutations run immediately inside an open
+        transaction but are committed in groups: after flush_interval seconds,
+        once flush_threshold writes are pending, or on flush(). Inserts still
+        return their real lastrowid and reads on this connection see pending
+        writes; other connections see them after the next flush.
+
+        bcrypt_rounds sets the cost of password hashes created from now on.
+        """
+        self.storage = storage if storage is not None else FileStorage(db_name)
+        self.bcrypt_rounds = bcrypt_rounds
+        self.conn = self.storage.directory()
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.pending_writes = 0
+        self.flush_timer = None
+        if write_behind:
+            # Don't lose the last group of writes on interpreter exit
+            atexit.register(self.flush)
+
+    @contextmanager
+    def writing(self, conn=None):
+        """Run one mutation: yield a cursor on conn (default: the directory), then commit.
+
+        The commit lock is held from the first statement through the commit,
+        so a background group commit only ever lands between whole mutations.
+        The mutation runs inside a savepoint: if the body raises, its own
+        statements are rolled back and writes still pending from earlier
+        mutations are kept for the next group commit.
+        """
+        conn = self.conn if conn is None else conn
+        with self.storage.lock:
+            # Open the transaction ourselves: a savepoint outside one would
+            # start its own, and releasing it would commit straight away
+            began = not conn.in_transaction
+            if began:
+                conn.execute('BEGIN')
+            conn.execute('SAVEPOINT mutation')
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.execute('ROLLBACK TO mutation')
+                conn.execute('RELEASE mutation')
+                if began:
+                    # Nothing else was pending; end the transaction so its
+                    # write lock doesn't outlive the failed mutation
+                    conn.rollback()
+                raise
+            conn.execute('RELEASE mutation')
+            self.commit(conn)
+
+    def commit(self, conn=None):
+        """Commit a mutation on conn (default: the directory) now, or queue it for the next group commit."""
+        if not self.write_behind:
+            (conn or self.conn).commit()
+            return
+
+        with self.storage.lock:
+            self.pending_writes += 1
+            if self.pending_writes >= self.flush_threshold:
+                self.flush()
+            elif self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    @traced("database.flush")
+    def flush(self):
+        """Commit all pending writes, one transaction per connection."""
+        with self.storage.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            for conn in self.storage.connections():
+                if self.pending_writes or conn.in_transaction:
+                    conn.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        """Flush pending writes; the shared connection itself stays open."""
+        self.flush()
+        if self.write_behind:
+            atexit.unregister(self.flush)
 
     def create_tables(self):
         """Create the users and tasks tables in the database."""
-        cursor = self.conn.cursor()
+        ConnectionManager.migrate(self.conn)
 
-        # Users table stores user credentials with hashed passwords
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL
-            )
-        ''')
+    @traced("database.add_user")
+    def add_user(self, username, password, run=call_directly):
+        """Register a new user with hashed password.
 
-        # Tasks table stores todo items linked to users
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                title TEXT NOT NULL,
-                completed INTEGER DEFAULT 0,
-                pomodoro_count INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-
-        self.conn.commit()
-
-    def add_user(self, username, password):
-        """Register a new user with hashed password."""
-        cursor = self.conn.cursor()
-        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-        cursor.execute('''
-            INSERT INTO users (username, password_hash)
-            VALUES (?, ?)
-        ''', (username, password_hash))
-        self.conn.commit()
+        run(func, *args) makes the SQL call; pass e.g. AsyncDatabase.call to
+        keep it on a database worker while bcrypt runs on this thread.
+        """
+        password_hash = hash_password(password, self.bcrypt_rounds)
+        return run(self.insert_user, username, password_hash)
+
+    def insert_user(self, username, password_hash):
+        """Insert a user row with an already hashed password; returns its id."""
+        with self.writing() as cursor:
+            cursor.execute('''
+                INSERT INTO users (username, password_hash)
+                VALUES (?, ?)
+            ''', (username, password_hash))
         return cursor.lastrowid
 
-    def verify_user(self, username, password):
-        """Authenticate user by checking username and password hash."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
-        user = cursor.fetchone()
+    @traced("database.verify_user")
+    def verify_user(self, username, password, run=call_directly):
+        """Authenticate user by checking username and password hash.
+
+        Returns the (id, password_hash) row on success. run is as for add_user.
+        """
+        user = run(self.get_password_hash, username)
 
-        if user and bcrypt.checkpw(password.encode(), user[1]):
+        if user and check_password(password, user[1]):
+            if self.hash_rounds(user[1]) != self.bcrypt_rounds:
+                self.rehash_password(user[0], password, run)
             return user
         return None
 
-    def add_task(self, user_id, title):
-        """Add a new task for a specific user."""
+    def get_password_hash(self, username):
+        """Return (id, password_hash) for username, or None."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
+        return cursor.fetchone()
+
+    def hash_rounds(self, password_hash):
+        """Return the cost factor recorded in a bcrypt hash ($2b$<cost>$...)."""
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode()
+        try:
+            return int(password_hash.split(b'$')[2])
+        except (IndexError, ValueError):
+            return None
+
+    @traced("database.rehash_password")
+    def rehash_password(self, user_id, password, run=call_directly):
+        """Store a fresh hash of password at the configured cost."""
+        password_hash = hash_password(password, self.bcrypt_rounds)
+        run(self.set_password_hash, user_id, password_hash)
+
+    def set_password_hash(self, user_id, password_hash):
+        """Replace a user's stored password hash."""
+        with self.writing() as cursor:
+            cursor.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+
+    @traced("database.create_session")
+    def create_session(self, user_id, token_hash, expires_at):
+        """Store a new remember-me session."""
+        with self.writing() as cursor:
+            cursor.execute('''
+                INSERT INTO sessions (token_hash, user_id, created_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (token_hash, user_id, time.time(), expires_at))
+
+    @traced("database.get_session_user")
+    def get_session_user(self, token_hash):
+        """Return (user_id, username) for a live, unrevoked session, else None."""
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO tasks (user_id, title)
-            VALUES (?, ?)
-        ''', (user_id, title))
-        self.conn.commit()
+            SELECT users.id, users.username
+            FROM sessions JOIN users ON users.id = sessions.user_id
+            WHERE sessions.token_hash = ? AND sessions.revoked = 0 AND sessions.expires_at > ?
+        ''', (token_hash, time.time()))
+        return cursor.fetchone()
+
+    @traced("database.revoke_session")
+    def revoke_session(self, token_hash):
+        """Mark a session as revoked so its token no longer logs in."""
+        with self.writing() as cursor:
+            cursor.execute('UPDATE sessions SET revoked = 1 WHERE token_hash = ?', (token_hash,))
+
+    @traced("database.prune_sessions")
+    def prune_sessions(self, batch_size=SESSION_PRUNE_BATCH):
+        """Delete expired and revoked sessions, batch_size rows per transaction."""
+        removed = 0
+        now = time.time()
+        while True:
+            with self.writing() as cursor:
+                cursor.execute('''
+                    DELETE FROM sessions WHERE token_hash IN (
+                        SELECT token_hash FROM sessions WHERE expires_at <= ? OR revoked = 1 LIMIT ?
+                    )
+                ''', (now, batch_size))
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return removed
+
+    @traced("database.add_task")
+    def add_task(self, user_id, title):
+        """Add a new task for a specific user."""
+        with self.writing(self.storage.for_user(user_id)) as cursor:
+            cursor.execute('''
+                INSERT INTO tasks (user_id, title)
+                VALUES (?, ?)
+            ''', (user_id, title))
         return cursor.lastrowid
 
+    @traced("database.add_tasks")
+    def add_tasks(self, user_id, tasks):
+        """Insert many (title, completed, pomodoro_count) rows in one transaction."""
+        with self.writing(self.storage.for_user(user_id)) as cursor:
+            cursor.executemany('''
+                INSERT INTO tasks (user_id, title, completed, pomodoro_count)
+                VALUES (?, ?, ?, ?)
+            ''', ((user_id, title, completed, pomodoro_count) for title, completed, pomodoro_count in tasks))
+        return cursor.rowcount
+
+    @traced("database.get_user_id")
+    def get_user_id(self, username):
+        """Return the id of the user with this username, or None."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @traced("database.owns_task")
+    def owns_task(self, user_id, task_id):
+        """Return True if task_id is one of user_id's tasks."""
+        cursor = self.storage.for_task(task_id).cursor()
+        cursor.execute('SELECT 1 FROM tasks WHERE id = ? AND user_id = ?', (task_id, user_id))
+        return cursor.fetchone() is not None
+
+    @traced("database.get_user_tasks")
     def get_user_tasks(self, user_id):
         """Retrieve all tasks belonging to a specific user."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT id, title, completed, pomodoro_count FROM tasks WHERE user_id = ?', (user_id,))
+        conn = self.storage.for_user(user_id)
+        cursor = conn.cursor()
+        cursor.row_factory = Task.from_row
+        cursor.execute('SELECT id, title, completed, pomodoro_count FROM tasks WHERE user_id = ? ORDER BY id',
+                       (user_id,))
+        return cursor.fetchall()
+
+    @traced("database.get_task_list")
+    def get_task_list(self, user_id, limit=None):
+        """Return a user's tasks as a compact TaskList, ordered by id.
+
+        Rows go straight into the list's arrays without building a Task per
+        row. With limit, at most that many tasks are read.
+        """
+        conn = self.storage.for_user(user_id)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, title, completed, pomodoro_count FROM tasks WHERE user_id = ? ORDER BY id '
+                       'LIMIT ?', (user_id, -1 if limit is None else limit))
+        return TaskList.from_rows(cursor)
+
+    def data_version(self, user_id=None):
+        """Return a number that changes whenever another connection commits.
+
+        It covers the file holding user_id's data, or the directory when
+        user_id is None. Commits made through this process's shared
+        connection leave it unchanged. Reading it touches no tables, so it is
+        cheap to poll.
+        """
+        conn = self.conn if user_id is None else self.storage.for_user(user_id)
+        return conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def local_changes(self):
+        """Return the number of rows written so far through each open connection.
+
+        Unlike data_version() it moves with this process's own writes, and
+        reading it runs no SQL.
+        """
+        return tuple(conn.total_changes for conn in self.storage.connections())
+
+    def change_token(self):
+        """Return a value that changes whenever anything is written to any open file.
+
+        It is (data versions, local_changes()), so it covers other
+        connections' commits as well as this process's own writes.
+        """
+        versions = tuple(conn.execute('PRAGMA data_version').fetchone()[0]
+                         for conn in self.storage.connections())
+        return versions, self.local_changes()
+
+    def task_revision(self, user_id):
+        """Return the user's task revision, bumped by every write to their tasks."""
+        conn = self.storage.for_user(user_id)
+        cursor = conn.cursor()
+        cursor.execute('SELECT revision FROM task_revisions WHERE user_id = ?', (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    @traced("database.task_changes")
+    def task_changes(self, user_id, since):
+        """Return (revision, changed, deleted_ids) for writes after revision since.
+
+        changed holds the current state of every task written since then.
+        Rows written while this runs may be reported again by the next call.
+        """
+        # Read the revision first, so nothing newer than it can be missed
+        revision = self.task_revision(user_id)
+        if revision == since:
+            return revision, [], []
+
+        cursor = self.storage.for_user(user_id).cursor()
+        cursor.execute('''
+            SELECT task_changes.task_id, tasks.title, tasks.completed, tasks.pomodoro_count
+            FROM task_changes LEFT JOIN tasks ON tasks.id = task_changes.task_id
+            WHERE task_changes.user_id = ? AND task_changes.revision > ?
+            ORDER BY task_changes.task_id
+        ''', (user_id, since))
+        changed = []
+        deleted_ids = []
+        for task_id, title, completed, pomodoro_count in cursor:
+            if title is None:
+                deleted_ids.append(task_id)
+            else:
+                changed.append(Task(task_id, title, completed, pomodoro_count))
+        return revision, changed, deleted_ids
+
+    @traced("database.poll_changes")
+    def poll_changes(self, user_id, seen=None):
+        """Check cheaply whether other connections changed anything since the last poll.
+
+        seen is the token returned by the previous call, or None. Returns a
+        (data_version, task revision) token for the file holding the user's
+        data; it equals seen while nothing has been committed elsewhere, and
+        its revision differs from seen's when the user's tasks were written.
+        """
+        version = self.data_version(user_id)
+        if seen is not None and version == seen[0]:
+            return seen
+        return version, self.task_revision(user_id)
+
+    def task_query(self, user_id, status=None, prefix=None, order='id', cursor=None):
+        """Build the SQL and parameters shared by paged and streamed task reads.
+
+        status is None, 'active' or 'completed'; prefix matches the start of
+        the title (case-insensitive); order is 'id' (oldest first) or
+        'pomodoros' (most pomodoros first, then oldest). cursor is the key of
+        the last row already read, as returned by get_task_page.
+        """
+        where = ['user_id = ?']
+        params = [user_id]
+        if status is not None:
+            where.append('completed = ?')
+            params.append(1 if status == 'completed' else 0)
+        if prefix:
+            escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where.append("title LIKE ? ESCAPE '\\'")
+            params.append(escaped + '%')
+
+        if order == 'pomodoros':
+            if cursor is not None:
+                where.append('(pomodoro_count < ? OR (pomodoro_count = ? AND id > ?))')
+                params.extend([cursor[0], cursor[0], cursor[1]])
+            order_by = 'pomodoro_count DESC, id'
+        elif order == 'id':
+            if cursor is not None:
+                where.append('id > ?')
+                params.append(cursor[0])
+            order_by = 'id'
+        else:
+            raise ValueError(f"Unknown task order: {order}")
+
+        sql = (f'SELECT id, title, completed, pomodoro_count FROM tasks '
+               f'WHERE {" AND ".join(where)} ORDER BY {order_by}')
+        return sql, params
+
+    def task_cursor(self, task, order):
+        """Return the keyset cursor that resumes after task."""
+        return (task.pomodoro_count, task.id) if order == 'pomodoros' else (task.id,)
+
+    @traced("database.get_task_page")
+    def get_task_page(self, user_id, status=None, prefix=None, order='id', cursor=None,
+                      limit=TASK_PAGE_SIZE):
+        """Return (tasks, next_cursor) for one page; next_cursor is None on the last page.
+
+        Filters and ordering are as for task_query. Pages are found by key, so
+        each one costs the same no matter how deep into the list it is.
+        """
+        conn = self.storage.for_user(user_id)
+        sql, params = self.task_query(user_id, status, prefix, order, cursor)
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = Task.from_row
+        # Fetch one extra row to learn whether another page follows
+        db_cursor.execute(sql + ' LIMIT ?', params + [limit + 1])
+        rows = db_cursor.fetchall()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, self.task_cursor(rows[-1], order)
+        return rows, None
+
+    def iter_user_tasks(self, user_id, status=None, prefix=None, order='id', batch_size=500):
+        """Yield a user's tasks one at a time, reading batch_size rows per fetch."""
+        conn = self.storage.for_user(user_id)
+        sql, params = self.task_query(user_id, status, prefix, order)
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = Task.from_row
+        db_cursor.execute(sql, params)
+        while True:
+            rows = db_cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+    @traced("database.search_tasks")
+    def search_tasks(self, user_id, query, limit=SEARCH_LIMIT):
+        """Return the user's tasks whose title matches query, best matches first.
+
+        Every word in query must match the start of a word in the title, so
+        "wri rep" finds "Write report".
+        """
+        conn = self.storage.for_user(user_id)
+        words = query.split()
+        if not words:
+            return []
+        # Quote each word so punctuation in user input can't form FTS syntax
+        terms = ' AND '.join('title:"{}"*'.format(word.replace('"', '""')) for word in words)
+        cursor = conn.cursor()
+        cursor.row_factory = Task.from_row
+        cursor.execute('''
+            SELECT tasks.id, tasks.title, tasks.completed, tasks.pomodoro_count
+            FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH ?
+            ORDER BY bm25(tasks_fts, 1.0, 0.0)
+            LIMIT ?
+        ''', (f'owner:u{int(user_id)} AND {terms}', limit))
         return cursor.fetchall()
 
+    @traced("database.complete_task")
     def complete_task(self, task_id):
         """Mark a task as completed."""
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE tasks SET completed = 1 WHERE id = ?', (task_id,))
-        self.conn.commit()
+        with self.writing(self.storage.for_task(task_id)) as cursor:
+            cursor.execute('UPDATE tasks SET completed = 1 WHERE id = ?', (task_id,))
 
+    @traced("database.delete_task")
     def delete_task(self, task_id):
         """Delete a task from the database."""
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-        self.conn.commit()
+        with self.writing(self.storage.for_task(task_id)) as cursor:
+            cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
 
+    @traced("database.increment_pomodoro")
     def increment_pomodoro(self, task_id):
         """Increase the pomodoro count for a task."""
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE tasks SET pomodoro_count = pomodoro_count + 1 WHERE id = ?', (task_id,))
-        self.conn.commit()
\ No newline at end of file
+        with self.writing(self.storage.for_task(task_id)) as cursor:
+            cursor.execute('UPDATE tasks SET pomodoro_count = pomodoro_count + 1 WHERE id = ?', (task_id,))
+
+    @traced("database.add_session")
+    def add_session(self, user_id, session_type, duration, task_id=None, ended_at=None):
+        """Log a finished "work" or "break" session and update its rollups.
+
+        duration is in seconds and ended_at is a Unix timestamp (defaults to
+        now). Days and ISO weeks are taken in local time.
+        """
+        with self.writing(self.storage.for_user(user_id)) as cursor:
+            session_id = self.log_session(cursor, user_id, session_type, duration, task_id, ended_at)
+        return session_id
+
+    @traced("database.finish_session")
+    def finish_session(self, user_id, session_type, duration, task_id=None, ended_at=None):
+        """Log a finished session as add_session does, crediting task_id a pomodoro for work.
+
+        Both writes commit together, so a task's pomodoro count never
+        disagrees with the session log and rollups. Only the user's own
+        task is credited; any other task_id is dropped from the log too.
+        """
+        with self.writing(self.storage.for_user(user_id)) as cursor:
+            if session_type == "work" and task_id is not None:
+                cursor.execute('UPDATE tasks SET pomodoro_count = pomodoro_count + 1 WHERE id = ? AND user_id = ?',
+                               (task_id, user_id))
+                if cursor.rowcount == 0:
+                    task_id = None  # Not the user's task; log the session without it
+            session_id = self.log_session(cursor, user_id, session_type, duration, task_id, ended_at)
+        return session_id
+
+    def log_session(self, cursor, user_id, session_type, duration, task_id, ended_at):
+        """Insert a session and update its rollups inside the caller's mutation; returns its id."""
+        if ended_at is None:
+            ended_at = time.time()
+        day = datetime.date.fromtimestamp(ended_at)
+        year, week, _ = day.isocalendar()
+        day_key = day.isoformat()
+        week_key = f"{year}-W{week:02d}"
+        is_work = session_type == "work"
+        work = (1 if is_work else 0, duration if is_work else 0)
+        rest = (0 if is_work else 1, 0 if is_work else duration)
+
+        cursor.execute('''
+            INSERT INTO pomodoro_sessions (user_id, task_id, session_type, duration, ended_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, task_id, session_type, duration, ended_at))
+        session_id = cursor.lastrowid
+
+        cursor.execute('''
+            INSERT INTO user_daily_stats (user_id, day, work_sessions, work_seconds, break_sessions, break_seconds)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                work_sessions = work_sessions + excluded.work_sessions,
+                work_seconds = work_seconds + excluded.work_seconds,
+                break_sessions = break_sessions + excluded.break_sessions,
+                break_seconds = break_seconds + excluded.break_seconds
+        ''', (user_id, day_key) + work + rest)
+        cursor.execute('''
+            INSERT INTO user_weekly_stats (user_id, week, work_sessions, work_seconds, break_sessions, break_seconds)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, week) DO UPDATE SET
+                work_sessions = work_sessions + excluded.work_sessions,
+                work_seconds = work_seconds + excluded.work_seconds,
+                break_sessions = break_sessions + excluded.break_sessions,
+                break_seconds = break_seconds + excluded.break_seconds
+        ''', (user_id, week_key) + work + rest)
+
+        if is_work:
+            if task_id is not None:
+                cursor.execute('''
+                    INSERT INTO task_stats (task_id, work_sessions, work_seconds, last_session_at)
+                    VALUES (?, 1, ?, ?)
+                    ON CONFLICT (task_id) DO UPDATE SET
+                        work_sessions = work_sessions + 1,
+                        work_seconds = work_seconds + excluded.work_seconds,
+                        last_session_at = excluded.last_session_at
+                ''', (task_id, duration, ended_at))
+            self.update_streak(cursor, user_id, day)
+
+        return session_id
+
+    def update_streak(self, cursor, user_id, day):
+        """Extend or restart the user's streak for a work session on day."""
+        cursor.execute('SELECT current_streak, longest_streak, last_day FROM user_streaks WHERE user_id = ?',
+                       (user_id,))
+        row = cursor.fetchone()
+        current, longest, last_day = row if row else (0, 0, None)
+        day_key = day.isoformat()
+
+        if last_day == day_key:
+            return
+        if last_day == (day - datetime.timedelta(days=1)).isoformat():
+            current += 1
+        elif last_day is None or last_day < day_key:
+            current = 1
+        else:
+            # Session logged for a past day (e.g. a backfill); leave the streak alone
+            return
+        cursor.execute('''
+            INSERT OR REPLACE INTO user_streaks (user_id, current_streak, longest_streak, last_day)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, current, max(longest, current), day_key))
+
+    @traced("database.get_day_stats")
+    def get_day_stats(self, user_id, day=None):
+        """Return (work_sessions, work_seconds, break_sessions, break_seconds) for a day (default today)."""
+        conn = self.storage.for_user(user_id)
+        day = day or datetime.date.today()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT work_sessions, work_seconds, break_sessions, break_seconds
+            FROM user_daily_stats WHERE user_id = ? AND day = ?
+        ''', (user_id, day.isoformat()))
+        return cursor.fetchone() or (0, 0, 0, 0)
+
+    @traced("database.get_week_stats")
+    def get_week_stats(self, user_id, day=None):
+        """Return (work_sessions, work_seconds, break_sessions, break_seconds) for the ISO week containing day."""
+        conn = self.storage.for_user(user_id)
+        year, week, _ = (day or datetime.date.today()).isocalendar()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT work_sessions, work_seconds, break_sessions, break_seconds
+            FROM user_weekly_stats WHERE user_id = ? AND week = ?
+        ''', (user_id, f"{year}-W{week:02d}"))
+        return cursor.fetchone() or (0, 0, 0, 0)
+
+    @traced("database.get_task_stats")
+    def get_task_stats(self, task_id):
+        """Return (work_sessions, work_seconds, last_session_at) for a task."""
+        conn = self.storage.for_task(task_id)
+        cursor = conn.cursor()
+        cursor.execute('SELECT work_sessions, work_seconds, last_session_at FROM task_stats WHERE task_id = ?',
+                       (task_id,))
+        return cursor.fetchone() or (0, 0, None)
+
+    @traced("database.get_streak")
+    def get_streak(self, user_id, today=None):
+        """Return (current_streak, longest_streak) in days as of today."""
+        conn = self.storage.for_user(user_id)
+        today = today or datetime.date.today()
+        cursor = conn.cursor()
+        cursor.execute('SELECT current_streak, longest_streak, last_day FROM user_streaks WHERE user_id = ?',
+                       (user_id,))
+        row = cursor.fetchone()
+        if not row:
+            return 0, 0
+        current, longest, last_day = row
+        # The streak survives until the end of the day after its last session
+        if last_day < (today - datetime.timedelta(days=1)).isoformat():
+            current = 0
+        return current, longest
+
+    @traced("database.save_timer_state")
+    def save_timer_state(self, user_id, is_work_session, remaining, deadline=None, task_id=None):
+        """Replace the user's timer checkpoint.
+
+        remaining is the seconds left; deadline is the Unix time at which a
+        running session ends, or None if the timer is stopped.
+        """
+        with self.writing(self.storage.for_user(user_id)) as cursor:
+            cursor.execute('''
+                INSERT OR REPLACE INTO timer_state (user_id, is_work_session, remaining, deadline, task_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, 1 if is_work_session else 0, remaining, deadline, task_id, time.time()))
+
+    @traced("database.get_timer_state")
+    def get_timer_state(self, user_id):
+        """Return (is_work_session, remaining, deadline, task_id) as last saved, or None."""
+        conn = self.storage.for_user(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT is_work_session, remaining, deadline, task_id FROM timer_state WHERE user_id = ?
+        ''', (user_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        is_work_session, remaining, deadline, task_id = row
+        return bool(is_work_session), remaining, deadline, task_id
\ No newline at end of file
@@ -3,17 +3,37 @@ Main GUI application built with CustomTkinter.
 Provides login/registration screens, task management, and pomodoro timer interface.
 """
 
+import logging
+import time
+from tkinter import filedialog
+
 import customtkinter as ctk
-from auth import AuthManager
-from database import Database
-from pomodoro_timer import PomodoroTimer
+from instrumentation import traced, tracer
+from pomodoro_timer import PomodoroTimer, TimerEventChannel
+
+logger = logging.getLogger(__name__)
 
 
 class PomodoroApp:
     """Main application class that manages all GUI screens and user interactions."""
 
-    def __init__(self):
-        """Initialize application with dark theme and default window size."""
+    ACTIVE_TASK_COLOR = "#1e3a8a"  # Dark blue color
+    # Above this many tasks only the rows in view are built as widgets
+    VIRTUAL_ROW_THRESHOLD = 200
+    ROW_HEIGHT = 40  # Height of a row including its padding, in virtual mode
+    TASK_PAGE_SIZE = 100  # Tasks fetched per page
+    LOAD_MORE_AT = 0.9  # Scroll position (0-1) at which the next page is fetched
+    SEARCH_DELAY_MS = 250  # Typing pause before a search runs
+    SPINNER_FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+    TIMER_POLL_MS = 100  # How often the GUI drains timer events
+    CHANGE_POLL_MS = 1000  # How often to check for writes by other instances or scripts
+
+    def __init__(self, db=None, resume=True):
+        """Initialize application with dark theme and default window size.
+
+        Unless resume is False, resume_session() runs once the login screen
+        has been drawn; otherwise the caller runs it.
+        """
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
 
@@ -21,11 +41,102 @@ class PomodoroApp:
         self.root.title("Pomodoro Todo App")
         self.root.geometry("700x500")
 
-        self.auth = AuthManager()
-        self.db = Database()
+        # The database and auth manager are opened by open_database() once
+        # the login screen is on screen
+        self.db = db
+        self.auth = None
+        self.db_worker = None  # AsyncDatabase running the GUI's database calls
         self.timer = PomodoroTimer()
+        # The timer thread only posts here; the GUI drains it on the Tk thread
+        self.timer_events = TimerEventChannel()
+        self.timer.set_callback(self.timer_events.post)
+        self.timer_poll_job = None
+        self.change_poll_job = None
+        self.seen_changes = None  # Token from the last Database.poll_changes
+        self.timer_text = None  # Text currently shown in timer_label
         self.current_task_id = None  # Currently active task for pomodoro tracking
+        self.spinner_job = None
+        self.search_job = None
+        self.search_query = ""
+        self.tasks_generation = 0  # Lets late results from an older load or search be dropped
+        self.diagnostics_window = None
         self.show_login()
+        if resume:
+            # Idle callbacks queued from an idle callback run after the first redraw
+            self.root.after_idle(self.root.after_idle, self.resume_session)
+
+    def resume_session(self):
+        """Open the database; on_database_open then checks for a saved session.
+
+        Returns the future of the open, as open_database does.
+        """
+        return self.open_database()
+
+    def on_session_resumed(self, success, message):
+        """Show the main screen if the saved session was still valid."""
+        # The user may have logged in by hand while the session was checked
+        if success and self.change_poll_job is None:
+            self.show_main_app()
+
+    def open_database(self):
+        """Start opening the shared database on the worker, once.
+
+        The login buttons stay disabled until on_database_open runs. Returns
+        the future of the open, or None if there was nothing to open.
+        """
+        if self.db_worker is not None:
+            return None
+        # Imported here so sqlite3 and the data layer load after the first frame
+        from async_database import AsyncDatabase
+
+        # Everything the app reads or writes, auth included, goes through one
+        # worker thread, so a slow disk or a locked file never freezes the UI.
+        # The worker opens the connection too, and is the only thread using it.
+        self.db_worker = AsyncDatabase(self.db, self.dispatch)
+        if self.db is not None:
+            self.on_database_open(self.db)
+            return None
+        future = self.db_worker.open(self.create_database, callback=self.on_database_open)
+        future.add_done_callback(self.check_database_opened)
+        return future
+
+    @traced("startup.open_database")
+    def create_database(self):
+        """Open the storage and database; runs on the database worker."""
+        from database import open_storage
+        from task_cache import CachedDatabase
+
+        # One Database shared by auth and task management; task reads are
+        # served from memory once loaded. $POMODORO_STORAGE picks where the
+        # data lives.
+        return CachedDatabase(storage=open_storage())
+
+    def check_database_opened(self, future):
+        """Report a database that couldn't be opened; called on the worker."""
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Couldn't open the database", exc_info=exc)
+            self.dispatch(self.show_database_error, exc)
+
+    def on_database_open(self, db):
+        """Create the auth manager, enable the login screen and look for a saved session."""
+        from auth import AuthManager
+
+        self.db = db
+        self.auth = AuthManager(db, worker=self.db_worker)
+        self.set_auth_busy(self.auth_label, None)
+        if self.auth_label.winfo_exists():
+            self.auth_label.configure(text="")
+        self.auth.resume_session_async(self.on_session_resumed, self.dispatch)
+
+    def show_database_error(self, exc):
+        """Tell the user the database couldn't be opened."""
+        self.set_auth_busy(self.auth_label, None)
+        for button in self.auth_buttons:
+            if button.winfo_exists():
+                button.configure(state="disabled")
+        if self.auth_label.winfo_exists():
+            self.auth_label.configure(text=f"Couldn't open the database: {exc}")
 
     def show_login(self):
         """Display login screen with username and password fields."""
@@ -41,14 +152,23 @@ class PomodoroApp:
 
         self.password_entry = ctk.CTkEntry(frame, placeholder_text="Password", show="*")
         self.password_entry.pack(pady=10)
+        # Keep the user logged in across launches
+        self.remember_check = ctk.CTkCheckBox(frame, text="Remember me")
+        self.remember_check.pack(pady=5)
         # Login button
-        ctk.CTkButton(frame, text="Login", command=self.login).pack(pady=10)
+        login_btn = ctk.CTkButton(frame, text="Login", command=self.login)
+        login_btn.pack(pady=10)
         # Go to registration button
-        ctk.CTkButton(frame, text="Register", command=self.show_register).pack(pady=5)
+        register_btn = ctk.CTkButton(frame, text="Register", command=self.show_register)
+        register_btn.pack(pady=5)
+        self.auth_buttons = [login_btn, register_btn]
 
         # Message display area
         self.auth_label = ctk.CTkLabel(frame, text="")
         self.auth_label.pack(pady=10)
+        if self.auth is None:
+            # Re-enabled by on_database_open
+            self.set_auth_busy(self.auth_label, "Opening database")
 
     def show_register(self):
         """Display registration screen for creating new user accounts."""
@@ -68,35 +188,84 @@ class PomodoroApp:
         self.reg_pass2 = ctk.CTkEntry(frame, placeholder_text="Confirm Password", show="*")
         self.reg_pass2.pack(pady=5)
 
-        ctk.CTkButton(frame, text="Register", command=self.register).pack(pady=10)
-        ctk.CTkButton(frame, text="Back to Login", command=self.show_login).pack()
+        register_btn = ctk.CTkButton(frame, text="Register", command=self.register)
+        register_btn.pack(pady=10)
+        back_btn = ctk.CTkButton(frame, text="Back to Login", command=self.show_login)
+        back_btn.pack()
+        self.auth_buttons = [register_btn, back_btn]
 
         self.reg_label = ctk.CTkLabel(frame, text="")
         self.reg_label.pack(pady=10)
 
     def login(self):
-        """Handle login button click and authenticate user."""
+        """Handle login button click and authenticate user off the UI thread."""
         username = self.username_entry.get()
         password = self.password_entry.get()
 
-        success, msg = self.auth.login(username, password)
+        self.set_auth_busy(self.auth_label, "Logging in")
+        self.auth.login_async(username, password, self.on_login_done, self.dispatch,
+                              remember=bool(self.remember_check.get()))
+
+    def on_login_done(self, success, msg):
+        """Show the login result once the credential check finishes."""
+        self.set_auth_busy(self.auth_label, None)
+        if not self.auth_label.winfo_exists():
+            return
         self.auth_label.configure(text=msg)
 
         if success:
             self.root.after(1000, self.show_main_app)
 
     def register(self):
-        """Handle registration button click and create new user account."""
+        """Handle registration button click and create new user account off the UI thread."""
         username = self.reg_user.get()
         password = self.reg_pass.get()
         confirm = self.reg_pass2.get()
 
-        success, msg = self.auth.register(username, password, confirm)
+        self.set_auth_busy(self.reg_label, "Creating account")
+        self.auth.register_async(username, password, confirm, self.on_register_done, self.dispatch)
+
+    def on_register_done(self, success, msg):
+        """Show the registration result once hashing finishes."""
+        self.set_auth_busy(self.reg_label, None)
+        if not self.reg_label.winfo_exists():
+            return
         self.reg_label.configure(text=msg)
 
         if success:
             self.root.after(1000, self.show_login)
 
+    def dispatch(self, func, *args):
+        """Run func(*args) on the Tk thread; safe to call from worker threads.
+
+        Passed as dispatch to AsyncDatabase and AuthManager.run_async, where
+        the contract is described.
+        """
+        self.root.after(0, func, *args)
+
+    def set_auth_busy(self, label, text):
+        """Disable the auth buttons and spin in label while text is set; restore on None."""
+        if self.spinner_job is not None:
+            self.root.after_cancel(self.spinner_job)
+            self.spinner_job = None
+
+        state = "disabled" if text else "normal"
+        for button in self.auth_buttons:
+            if button.winfo_exists():
+                button.configure(state=state)
+
+        if text:
+            self.spin(label, text, 0)
+
+    def spin(self, label, text, frame):
+        """Advance the spinner shown in label by one frame."""
+        if not label.winfo_exists():
+            self.spinner_job = None
+            return
+        label.configure(text=f"{self.SPINNER_FRAMES[frame]} {text}")
+        next_frame = (frame + 1) % len(self.SPINNER_FRAMES)
+        self.spinner_job = self.root.after(80, self.spin, label, text, next_frame)
+
     def show_main_app(self):
         """Display main application screen with timer and task management."""
         self.clear_window()
@@ -106,13 +275,17 @@ class PomodoroApp:
         timer_frame.pack(pady=10, padx=10, fill="x")
 
         # FIX: Use the actual timer time instead of hardcoded "25:00"
-        initial_time = self.timer.format_time(self.timer.current_time)
-        self.timer_label = ctk.CTkLabel(timer_frame, text=initial_time, font=("Arial", 36))
+        self.timer_text = self.timer.format_time(self.timer.current_time)
+        self.timer_label = ctk.CTkLabel(timer_frame, text=self.timer_text, font=("Arial", 36))
         self.timer_label.pack(pady=10)
 
         self.session_label = ctk.CTkLabel(timer_frame, text="Work Session")
         self.session_label.pack()
 
+        # Today's focus time and streak, read from the session rollups
+        self.stats_label = ctk.CTkLabel(timer_frame, text="", text_color="gray")
+        self.stats_label.pack()
+
         btn_frame = ctk.CTkFrame(timer_frame)
         btn_frame.pack(pady=10)
 
@@ -132,140 +305,574 @@ class PomodoroApp:
         self.task_entry.pack(side="left", fill="x", expand=True, padx=5)
         ctk.CTkButton(add_frame, text="Add", command=self.add_task, width=60).pack(side="right")
 
+        # Search-as-you-type over task titles
+        self.search_entry = ctk.CTkEntry(tasks_frame, placeholder_text="Search tasks")
+        self.search_entry.pack(pady=(0, 5), padx=15, fill="x")
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        self.search_query = ""
+
         # Tasks List
         self.tasks_list = ctk.CTkScrollableFrame(tasks_frame)
         self.tasks_list.pack(pady=10, padx=10, fill="both", expand=True)
 
-        # Logout Button
-        ctk.CTkButton(self.root, text="Logout", command=self.logout).pack(pady=10)
-
-        # Setup timer callback
-        self.timer.set_callback(self.update_timer)
+        # Spacers bracket the task rows; in virtual mode they take the place
+        # of the rows scrolled out of view
+        self.top_spacer = ctk.CTkFrame(self.tasks_list, height=1, fg_color="transparent")
+        self.top_spacer.pack(fill="x")
+        self.bottom_spacer = ctk.CTkFrame(self.tasks_list, height=1, fg_color="transparent")
+        self.bottom_spacer.pack(fill="x")
+        self.task_rows = {}  # task id -> row widgets and last rendered state
+        self.tasks = []
+        self.tasks_cursor = None  # Keyset cursor of the next unloaded page, if any
+        self.load_more_pending = False
+        self.empty_label = None
+        self.virtual_mode = False
+        self.first_visible_row = 0
+        self.scroll_render_pending = False
+
+        # CTkScrollableFrame has no scroll event, so hook the canvas' scroll
+        # command and forward to the scrollbar ourselves
+        self.tasks_scrollbar_set = self.tasks_list._scrollbar.set
+        self.tasks_list._parent_canvas.configure(yscrollcommand=self.on_tasks_scrolled)
+
+        # Logout and diagnostics buttons
+        bottom_frame = ctk.CTkFrame(self.root, fg_color="transparent")
+        bottom_frame.pack(pady=10)
+        ctk.CTkButton(bottom_frame, text="Logout", command=self.logout).pack(side="left", padx=5)
+        ctk.CTkButton(bottom_frame, text="Diagnostics", command=self.show_diagnostics,
+                      width=90, fg_color="gray30").pack(side="left", padx=5)
+
+        # Start draining timer events
+        self.poll_timer_events()
+        # The first poll records the starting point; it is queued ahead of the
+        # loads so nothing written in between goes unnoticed
+        self.seen_changes = None
+        self.poll_changes()
+        # Pick the timer up where the last run left it
+        self.db_worker.submit(self.db.get_timer_state, self.auth.get_current_user_id(),
+                              callback=self.restore_timer)
+        self.update_stats()
         self.load_tasks()
+        # Fill the task cache behind the first page, so it isn't held up by
+        # reading the whole list and later reads come from memory
+        preload = getattr(self.db, 'preload', None)
+        if preload is not None:
+            self.db_worker.submit(preload, self.auth.get_current_user_id())
 
     def start_timer(self):
         """Start the pomodoro timer."""
-        print("[GUI DEBUG] Start button clicked")
         self.timer.start()
+        self.save_timer_state()
 
     def pause_timer(self):
         """Pause the pomodoro timer."""
         self.timer.pause()
+        self.save_timer_state()
 
     def reset_timer(self):
         """Reset the pomodoro timer to initial state."""
         self.timer.reset()
+        self.save_timer_state()
         # Update display immediately after reset
         self.update_timer(self.timer.current_time)
 
+    def save_timer_state(self):
+        """Checkpoint the timer and active task on the worker.
+
+        Called on transitions only, never per tick: a running session is
+        saved as its deadline, so the time left can be worked out later.
+        """
+        is_work_session, remaining, deadline = self.timer.checkpoint()
+        self.db_worker.submit(self.db.save_timer_state, self.auth.get_current_user_id(),
+                              is_work_session, remaining, deadline, self.current_task_id)
+
+    def restore_timer(self, state):
+        """Resume the saved timer, crediting a session that ran out while the app was closed."""
+        if not self.timer_label.winfo_exists():
+            return
+        if state is None:
+            # Nothing saved for this user; don't carry over the previous user's timer
+            self.timer.reset()
+            self.current_task_id = None
+            return
+
+        is_work_session, remaining, deadline, task_id = state
+        self.current_task_id = task_id
+        completed = self.timer.restore(is_work_session, remaining, deadline)
+        if completed:
+            logger.debug("Crediting %s session that ended at %s", completed, deadline)
+            self.record_session(completed, ended_at=deadline)
+            self.save_timer_state()
+
+        session_type = "Work" if self.timer.is_work_session else "Break"
+        self.session_label.configure(text=f"{session_type} Session")
+        self.update_timer(self.timer.current_time)
+        if task_id is not None:
+            self.load_tasks()  # Highlight the restored active task
+
     def set_active_task(self, task_id):
         """Set the currently active task for pomodoro tracking."""
-        print(f"[GUI DEBUG] Setting active task: {task_id}")
+        logger.debug("Setting active task: %s", task_id)
         self.current_task_id = task_id
+        self.save_timer_state()
         self.load_tasks()  # Refresh to show color change
 
+    def poll_timer_events(self):
+        """Apply queued timer events on the Tk thread and schedule the next poll."""
+        if self.timer_poll_job is not None:
+            self.root.after_cancel(self.timer_poll_job)
+        for seconds, session_complete in self.timer_events.drain():
+            self.update_timer(seconds, session_complete)
+        self.timer_poll_job = self.root.after(self.TIMER_POLL_MS, self.poll_timer_events)
+
+    def stop_timer_events(self):
+        """Stop polling timer events, e.g. when leaving the main screen."""
+        if self.timer_poll_job is not None:
+            self.root.after_cancel(self.timer_poll_job)
+            self.timer_poll_job = None
+        self.timer_events.drain()  # Drop events meant for the screen being left
+
+    def poll_changes(self):
+        """Ask the worker whether anything was written elsewhere, and schedule the next check."""
+        self.change_poll_job = self.root.after(self.CHANGE_POLL_MS, self.poll_changes)
+        self.db_worker.submit(self.db.poll_changes, self.auth.get_current_user_id(), self.seen_changes,
+                              callback=self.on_changes_polled)
+
+    def on_changes_polled(self, token):
+        """Refresh stats, and tasks if the user's were written, after a change elsewhere."""
+        if self.change_poll_job is None or token == self.seen_changes:
+            return
+        seen, self.seen_changes = self.seen_changes, token
+        if seen is None:
+            return
+        self.update_stats()
+        if token[1] != seen[1]:
+            self.load_tasks()
+
+    def stop_change_polling(self):
+        """Stop checking for outside writes, e.g. when leaving the main screen."""
+        if self.change_poll_job is not None:
+            self.root.after_cancel(self.change_poll_job)
+            self.change_poll_job = None
+
     def update_timer(self, seconds, session_complete=False):
         """Update timer display when time changes or session completes."""
         formatted = self.timer.format_time(seconds)
-        self.timer_label.configure(text=formatted)
-
-        print(f"[GUI DEBUG] Timer updated: {formatted}, session_complete={session_complete}")
-        print(f"[GUI DEBUG] Active task ID: {self.current_task_id}")
+        # Only redraw when the visible MM:SS text actually changes
+        if formatted != self.timer_text:
+            self.timer_text = formatted
+            self.timer_label.configure(text=formatted)
 
         if session_complete:  # session_complete is now "work" or "break"
-            print(f"[GUI DEBUG] Session completed: {session_complete}")
+            logger.debug("Session completed: %s", session_complete)
             session_type = "Break" if self.timer.is_work_session else "Work"
             self.session_label.configure(text=f"{session_type} Session")
+            self.record_session(session_complete)
 
-            # Only increment pomodoro count if a work session completed
+            # The active task was credited a pomodoro along with the session
             if session_complete == "work" and self.current_task_id:
-                print(f"[GUI DEBUG] INCREMENTING POMODORO for task {self.current_task_id}")
-                # Use root.after to run code in main thread
-                self.root.after(0, self.increment_pomodoro_safe, self.current_task_id)
+                logger.debug("Crediting pomodoro to task %s", self.current_task_id)
+                self.load_tasks()  # Refresh the display
             elif session_complete == "work":
-                print(f"[GUI DEBUG] Work session completed but no active task selected!")
-            else:
-                print(f"[GUI DEBUG] Break session completed, no pomodoro increment")
-
-    def increment_pomodoro_safe(self, task_id):
-        """Safely increment pomodoro count from main thread."""
-        print(f"[GUI DEBUG] Safe increment for task {task_id}")
-        self.db.increment_pomodoro(task_id)
-        self.load_tasks()  # Refresh the display
+                logger.debug("Work session completed with no active task")
+            # The timer now waits at the start of the next session
+            self.save_timer_state()
+
+    def record_session(self, session_type, ended_at=None):
+        """Log a finished session, crediting the active task for work, and refresh the stats line."""
+        is_work = session_type == "work"
+        duration = self.timer.work_time if is_work else self.timer.break_time
+        task_id = self.current_task_id if is_work else None
+        self.db_worker.submit(self.db.finish_session, self.auth.get_current_user_id(),
+                              session_type, duration, task_id, ended_at)
+        self.update_stats()
+
+    def update_stats(self):
+        """Fetch today's focus time and the current streak on the worker."""
+        user_id = self.auth.get_current_user_id()
+
+        def read_stats():
+            return self.db.get_day_stats(user_id), self.db.get_streak(user_id)
+
+        self.db_worker.submit(read_stats, callback=self.show_stats)
+
+    def show_stats(self, stats):
+        """Show the stats read by update_stats."""
+        if not self.stats_label.winfo_exists():
+            return
+        (work_sessions, work_seconds, _, _), (streak, _) = stats
+        days = "day" if streak == 1 else "days"
+        self.stats_label.configure(
+            text=f"Today: 🍅 {work_sessions} · {work_seconds // 60} min focused · Streak: {streak} {days}")
 
     def add_task(self):
         """Add a new task from the input field to the database."""
         task_text = self.task_entry.get()
         if task_text:
-            self.db.add_task(self.auth.get_current_user_id(), task_text)
+            self.db_worker.submit(self.db.add_task, self.auth.get_current_user_id(), task_text)
             self.task_entry.delete(0, "end")
             self.load_tasks()
 
-    def load_tasks(self):
-        """Load and display all tasks for the current user."""
-        # Clear all currently displayed tasks
-        for widget in self.tasks_list.winfo_children():
-            widget.destroy()
+    def on_search_changed(self, event=None):
+        """Debounce typing in the search box."""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(self.SEARCH_DELAY_MS, self.apply_search)
+
+    def cancel_search(self):
+        """Drop a debounced search that hasn't run yet, e.g. when leaving the main screen."""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+
+    def apply_search(self):
+        """Show search results for the search box text, or the full list when empty."""
+        self.search_job = None
+        query = self.search_entry.get().strip()
+        if query == self.search_query:
+            return
+        self.search_query = query
+        self.first_visible_row = 0
+        self.load_tasks()
+
+    def run_search(self):
+        """Search on the database worker; results come back through dispatch."""
+        self.tasks_generation += 1
+        generation = self.tasks_generation
+        return self.db_worker.submit(self.db.search_tasks, self.auth.get_current_user_id(), self.search_query,
+                                     callback=lambda results: self.show_search_results(generation, results))
 
-        # Get tasks from database
-        tasks = self.db.get_user_tasks(self.auth.get_current_user_id())
+    def show_search_results(self, generation, results):
+        """Render search results unless a newer load or search has been started since."""
+        if generation != self.tasks_generation or not self.search_query:
+            return
+        if not self.tasks_list.winfo_exists():
+            return
+        self.tasks = results
+        self.tasks_cursor = None
+        self.render_tasks()
+
+    def load_tasks(self):
+        """Queue a reload of the current user's tasks; returns the database future.
+
+        The rows are updated on the Tk thread once the results arrive. The
+        gui.load_tasks span runs from here until then, not just while queueing.
+        """
+        if self.search_query:
+            # Keep showing matches, refreshed, while a search is active
+            return self.run_search()
+
+        # Refresh everything already scrolled into view, but never less than a page
+        self.tasks_generation += 1
+        generation = self.tasks_generation
+        limit = max(self.TASK_PAGE_SIZE, len(self.tasks))
+        requested = time.perf_counter()
+        return self.db_worker.submit(self.db.get_task_page, self.auth.get_current_user_id(), limit=limit,
+                                     callback=lambda page: self.show_tasks(generation, page, requested))
+
+    def show_tasks(self, generation, page, requested):
+        """Render a freshly loaded first page unless a newer load has been started since."""
+        if generation != self.tasks_generation or not self.tasks_list.winfo_exists():
+            return
+        if tracer.enabled:
+            tracer.record("gui.load_tasks", time.perf_counter() - requested)
+        self.tasks, self.tasks_cursor = page
+        self.load_more_pending = False
+        self.render_tasks()
+
+    def load_more_tasks(self):
+        """Fetch the next page of tasks once the list is scrolled near its end."""
+        if self.tasks_cursor is None or not self.tasks_list.winfo_exists():
+            self.load_more_pending = False
+            return
+        # load_more_pending stays set until the page arrives, so scrolling
+        # meanwhile doesn't queue the same page twice
+        generation = self.tasks_generation
+        self.db_worker.submit(self.db.get_task_page, self.auth.get_current_user_id(),
+                              cursor=self.tasks_cursor, limit=self.TASK_PAGE_SIZE,
+                              callback=lambda page: self.show_more_tasks(generation, page))
+
+    def show_more_tasks(self, generation, page):
+        """Append a page fetched by load_more_tasks, if the list hasn't been reloaded since."""
+        if generation != self.tasks_generation or not self.tasks_list.winfo_exists():
+            return
+        self.load_more_pending = False
+        more, self.tasks_cursor = page
+        self.tasks = self.tasks + more
+        self.render_tasks()
+
+    @traced("gui.render_tasks")
+    def render_tasks(self):
+        """Bring the task list widgets in line with the loaded tasks."""
+        virtual = len(self.tasks) > self.VIRTUAL_ROW_THRESHOLD
+        if virtual != self.virtual_mode:
+            # Row geometry differs between the two modes, so start over
+            self.reset_task_rows()
+            self.virtual_mode = virtual
 
         # If no tasks
-        if not tasks:
-            ctk.CTkLabel(self.tasks_list, text="No tasks yet").pack(pady=20)
+        if not self.tasks:
+            self.sync_task_rows([])
+            self.set_spacer_heights(0, 0)
+            if self.empty_label is None:
+                self.empty_label = ctk.CTkLabel(self.tasks_list, text="No tasks yet")
+                self.empty_label.pack(pady=20)
             return
 
-        # Display each task
-        for task_id, title, completed, pomodoro_count in tasks:
-            # Create a frame for each task
+        if self.empty_label is not None:
+            self.empty_label.destroy()
+            self.empty_label = None
+
+        if virtual:
+            # Only the rows inside the scrolled window get widgets
+            count = self.visible_row_count()
+            start = max(0, min(self.first_visible_row, len(self.tasks) - count))
+            end = min(len(self.tasks), start + count)
+            self.set_spacer_heights(start * self.ROW_HEIGHT, (len(self.tasks) - end) * self.ROW_HEIGHT)
+            self.sync_task_rows(self.tasks[start:end])
+        else:
+            self.set_spacer_heights(0, 0)
+            self.sync_task_rows(self.tasks)
+
+    def sync_task_rows(self, tasks):
+        """Create, patch or destroy rows so they match the given tasks, in order."""
+        wanted = {task.id for task in tasks}
+
+        # Remove rows for deleted (or scrolled away) tasks
+        for task_id in [tid for tid in self.task_rows if tid not in wanted]:
+            self.task_rows.pop(task_id)['frame'].destroy()
+
+        # task_rows is kept in display order; kept rows only need repacking
+        # when their relative order changed (e.g. new search ranking)
+        reorder = list(self.task_rows) != [task.id for task in tasks if task.id in self.task_rows]
+
+        rows = {}
+        previous = self.top_spacer
+        for task in tasks:
+            row = self.task_rows.get(task.id)
+            if row is None:
+                row = self.create_task_row(task)
+                # New rows are slotted in right after their predecessor
+                row['frame'].pack(fill="x", pady=2, after=previous)
+            else:
+                self.update_task_row(row, task)
+                if reorder:
+                    row['frame'].pack(fill="x", pady=2, after=previous)
+            rows[task.id] = row
+            previous = row['frame']
+        self.task_rows = rows
+
+    def task_row_state(self, task):
+        """Return the values a rendered task row depends on."""
+        return task.title, task.completed, task.pomodoro_count, task.id == self.current_task_id
+
+    def create_task_row(self, task):
+        """Build the widgets for a single task row."""
+        task_id, title, completed, pomodoro_count = task.id, task.title, task.completed, task.pomodoro_count
+        state = self.task_row_state(task)
+        tracer.count("gui.rows_created")
+
+        # Create a frame for each task
+        if self.virtual_mode:
+            # Fixed height so spacers can stand in for rows that aren't built
+            task_frame = ctk.CTkFrame(self.tasks_list, height=self.ROW_HEIGHT - 4)
+            task_frame.pack_propagate(False)
+        else:
             task_frame = ctk.CTkFrame(self.tasks_list)
+        row = {'frame': task_frame, 'state': state, 'fg_color': task_frame.cget("fg_color")}
+
+        # Highlight the currently active task
+        if state[3]:
+            task_frame.configure(fg_color=self.ACTIVE_TASK_COLOR)
+
+        # Task title (with ✓ if completed)
+        row['title'] = ctk.CTkLabel(task_frame, text=self.task_title_text(title, completed),
+                                    text_color="gray" if completed else "white")
+        row['title'].pack(side="left", padx=5)
+
+        # Pomodoro counter
+        row['count'] = ctk.CTkLabel(task_frame, text=f"🍅 {pomodoro_count}")
+        row['count'].pack(side="left", padx=5)
+
+        # Control buttons (only for incomplete tasks)
+        row['buttons'] = []
+        if not completed:
+            # "Work on This" button to set active task
+            work_btn = ctk.CTkButton(task_frame, text="Work on This", width=90,
+                                     command=lambda tid=task_id: self.set_active_task(tid))
+            work_btn.pack(side="right", padx=2)
+
+            # "Complete" button to mark task as done
+            complete_btn = ctk.CTkButton(task_frame, text="Complete", width=80,
+                                         command=lambda tid=task_id: self.complete_task(tid))
+            complete_btn.pack(side="right", padx=2)
+            row['buttons'] = [work_btn, complete_btn]
+
+        # "Delete" button (for all tasks)
+        ctk.CTkButton(task_frame, text="Delete", width=60,
+                      command=lambda tid=task_id: self.delete_task(tid)).pack(side="right", padx=2)
+        return row
+
+    def update_task_row(self, row, task):
+        """Patch an existing row in place, touching only the widgets that changed."""
+        state = self.task_row_state(task)
+        if state == row['state']:
+            return
+        tracer.count("gui.rows_patched")
 
-            # Highlight the currently active task
-            if task_id == self.current_task_id:
-                task_frame.configure(fg_color="#1e3a8a")  # Dark blue color
-                print(f"[GUI DEBUG] Highlighting active task: {title}")
-
-            task_frame.pack(fill="x", pady=2)
+        title, completed, pomodoro_count, active = state
+        old_title, old_completed, old_count, old_active = row['state']
 
-            # Task text (with ✓ if completed)
-            text = f"✓ {title}" if completed else title
-            text_color = "gray" if completed else "white"
+        if old_completed and not completed:
+            # Rare: a task became active again, so rebuild it with its buttons
+            frame = row['frame']
+            row.update(self.create_task_row(task))
+            row['frame'].pack(fill="x", pady=2, after=frame)
+            frame.destroy()
+            return
 
-            # Task title
-            label = ctk.CTkLabel(task_frame, text=text, text_color=text_color)
-            label.pack(side="left", padx=5)
+        if active != old_active:
+            row['frame'].configure(fg_color=self.ACTIVE_TASK_COLOR if active else row['fg_color'])
+
+        if title != old_title or completed != old_completed:
+            row['title'].configure(text=self.task_title_text(title, completed),
+                                   text_color="gray" if completed else "white")
+
+        if completed and not old_completed:
+            for button in row['buttons']:
+                button.destroy()
+            row['buttons'] = []
+
+        if pomodoro_count != old_count:
+            row['count'].configure(text=f"🍅 {pomodoro_count}")
+
+        row['state'] = state
+
+    def task_title_text(self, title, completed):
+        """Return the label text for a task title."""
+        return f"✓ {title}" if completed else title
+
+    def reset_task_rows(self):
+        """Destroy every cached row widget."""
+        for row in self.task_rows.values():
+            row['frame'].destroy()
+        self.task_rows = {}
+        self.first_visible_row = 0
+
+    def set_spacer_heights(self, top, bottom):
+        """Size the spacers that stand in for rows outside the visible window."""
+        # A zero-height frame still takes a pixel, which is harmless here
+        self.top_spacer.configure(height=max(top, 1))
+        self.bottom_spacer.configure(height=max(bottom, 1))
+
+    def visible_row_count(self):
+        """Number of rows that fit in the task list, plus a little overscan."""
+        height = self.tasks_list._parent_canvas.winfo_height()
+        if height <= 1:
+            # Not drawn yet, assume a full default-sized window
+            height = 500
+        return height // self.ROW_HEIGHT + 4
+
+    def on_tasks_scrolled(self, first, last):
+        """Scroll callback for the task list: page in more tasks and move the rendered window."""
+        self.tasks_scrollbar_set(first, last)
+        if not self.tasks:
+            return
 
-            # Pomodoro counter
-            ctk.CTkLabel(task_frame, text=f"🍅 {pomodoro_count}").pack(side="left", padx=5)
+        if float(last) >= self.LOAD_MORE_AT and self.tasks_cursor is not None and not self.load_more_pending:
+            self.load_more_pending = True
+            self.root.after_idle(self.load_more_tasks)
 
-            # Control buttons (only for incomplete tasks)
-            if not completed:
-                # "Work on This" button to set active task
-                ctk.CTkButton(task_frame, text="Work on This", width=90,
-                              command=lambda tid=task_id: self.set_active_task(tid)).pack(side="right", padx=2)
+        if not self.virtual_mode:
+            return
 
-                # "Complete" button to mark task as done
-                ctk.CTkButton(task_frame, text="Complete", width=80,
-                              command=lambda tid=task_id: self.complete_task(tid)).pack(side="right", padx=2)
+        first_row = int(float(first) * len(self.tasks))
+        if first_row != self.first_visible_row:
+            self.first_visible_row = first_row
+            if not self.scroll_render_pending:
+                self.scroll_render_pending = True
+                self.root.after_idle(self.render_scrolled_tasks)
 
-            # "Delete" button (for all tasks)
-            ctk.CTkButton(task_frame, text="Delete", width=60,
-                          command=lambda tid=task_id: self.delete_task(tid)).pack(side="right", padx=2)
+    def render_scrolled_tasks(self):
+        """Re-render the visible window after scrolling settles."""
+        self.scroll_render_pending = False
+        if self.virtual_mode:
+            self.render_tasks()
 
     def complete_task(self, task_id):
         """Mark a task as completed in the database."""
-        self.db.complete_task(task_id)
+        self.db_worker.submit(self.db.complete_task, task_id)
         self.load_tasks()
 
     def delete_task(self, task_id):
         """Delete a task from the database."""
-        self.db.delete_task(task_id)
+        self.db_worker.submit(self.db.delete_task, task_id)
         self.load_tasks()
 
+    def show_diagnostics(self):
+        """Open (or raise) the window showing span latencies and counters."""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.focus()
+            return
+
+        window = ctk.CTkToplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("640x420")
+        self.diagnostics_window = window
+
+        controls = ctk.CTkFrame(window, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=5)
+        switch = ctk.CTkSwitch(controls, text="Tracing",
+                               command=lambda: tracer.enable(bool(switch.get())))
+        if tracer.enabled:
+            switch.select()
+        switch.pack(side="left")
+        ctk.CTkButton(controls, text="Export...", width=80,
+                      command=self.export_diagnostics).pack(side="right", padx=5)
+        ctk.CTkButton(controls, text="Reset", width=60, command=tracer.reset).pack(side="right", padx=5)
+
+        self.diagnostics_text = ctk.CTkTextbox(window, font=("Courier", 12))
+        self.diagnostics_text.pack(fill="both", expand=True, padx=10, pady=5)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        """Redraw the diagnostics table once a second while the window is open."""
+        if self.diagnostics_window is None or not self.diagnostics_window.winfo_exists():
+            self.diagnostics_window = None
+            return
+
+        snapshot = tracer.snapshot()
+        lines = [f"{'span':<30}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, summary in snapshot['spans'].items():
+            lines.append(f"{name:<30}{summary['count']:>8}{summary['p50'] * 1000:>10.3f}"
+                         f"{summary['p95'] * 1000:>10.3f}{summary['max'] * 1000:>10.3f}")
+        lines.append("")
+        lines.append(f"{'counter':<30}{'value':>8}")
+        for name, value in snapshot['counters'].items():
+            lines.append(f"{name:<30}{value:>8}")
+
+        self.diagnostics_text.configure(state="normal")
+        self.diagnostics_text.delete("1.0", "end")
+        self.diagnostics_text.insert("1.0", "\n".join(lines))
+        self.diagnostics_text.configure(state="disabled")
+        self.diagnostics_window.after(1000, self.refresh_diagnostics)
+
+    def export_diagnostics(self):
+        """Save the current metrics as JSON or CSV."""
+        path = filedialog.asksaveasfilename(
+            parent=self.diagnostics_window, defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if path:
+            tracer.export(path)
+
     def logout(self):
         """Logout current user and return to login screen."""
-        self.auth.logout()
         self.timer.pause()
+        self.save_timer_state()
+        self.auth.logout()
+        self.stop_timer_events()
+        self.stop_change_polling()
+        self.cancel_search()
         self.show_login()
 
     def clear_window(self):
@@ -273,6 +880,20 @@ class PomodoroApp:
         for widget in self.root.winfo_children():
             widget.destroy()
 
+    def quit(self):
+        """Stop the periodic jobs and close the window, ending the main loop."""
+        self.stop_timer_events()
+        self.stop_change_polling()
+        self.cancel_search()
+        self.root.destroy()
+
     def run(self):
         """Start the application main event loop."""
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
         self.root.mainloop()
+        # Finish queued database calls and commit anything held back by a
+        # write-behind database
+        if self.db_worker is not None:
+            self.db_worker.close()
+        elif self.db is not None:
+            self.db.close()
@@ -0,0 +1,197 @@
+"""
+Lightweight tracing and metrics.
+Named spans feed per-name latency histograms, and counters track events.
+Everything is off by default; when disabled, a traced call costs one
+attribute check.
+
+Set POMODORO_TRACE=1 to enable tracing at startup, and POMODORO_TRACE_FILE
+to a .json or .csv path to export the metrics when the process exits.
+"""
+
+import atexit
+import csv
+import functools
+import json
+import os
+import threading
+import time
+
+
+class Histogram:
+    """Latency histogram with power-of-two microsecond buckets."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    BUCKETS = 32  # Bucket i counts durations under 2**i microseconds
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * self.BUCKETS
+
+    def record(self, seconds):
+        """Add one duration."""
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        index = min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)
+        self.buckets[index] += 1
+
+    def percentile(self, fraction):
+        """Upper bound in seconds of the bucket holding the given fraction of samples."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(2 ** index / 1e6, self.max)
+        return self.max
+
+    def snapshot(self):
+        """Summary of the histogram as a dict of plain numbers."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min or 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class Span:
+    """Context manager that records its duration under a name."""
+
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSpan:
+    """Span that does nothing; handed out while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Collects span histograms and counters while enabled."""
+
+    def __init__(self):
+        """Create a disabled tracer with no data."""
+        self.enabled = False
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        """Turn collection on or off; collected data is kept."""
+        self.enabled = enabled
+
+    def reset(self):
+        """Drop all collected data."""
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def span(self, name):
+        """Return a context manager timing its body under name."""
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def record(self, name, seconds):
+        """Add a duration to the named histogram."""
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def count(self, name, amount=1):
+        """Increase the named counter."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Return {'spans': {name: summary}, 'counters': {name: value}}."""
+        with self.lock:
+            return {
+                'spans': {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def export(self, path):
+        """Write a snapshot to path as JSON, or as CSV if path ends in .csv."""
+        snapshot = self.snapshot()
+        with open(path, 'w', newline='') as file:
+            if not path.lower().endswith('.csv'):
+                json.dump(snapshot, file, indent=2)
+                return
+            fields = ['count', 'total', 'mean', 'min', 'p50', 'p95', 'p99', 'max']
+            writer = csv.writer(file)
+            writer.writerow(['kind', 'name'] + fields)
+            for name, summary in snapshot['spans'].items():
+                writer.writerow(['span', name] + [summary[field] for field in fields])
+            for name, value in snapshot['counters'].items():
+                writer.writerow(['counter', name, value] + [''] * (len(fields) - 1))
+
+
+tracer = Tracer()
+
+
+def traced(name):
+    """Decorator recording each call of the function as a span called name."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def configure_from_env():
+    """Apply POMODORO_TRACE and POMODORO_TRACE_FILE."""
+    if os.environ.get('POMODORO_TRACE', '') not in ('', '0'):
+        tracer.enable()
+    path = os.environ.get('POMODORO_TRACE_FILE')
+    if path:
+        tracer.enable()
+        atexit.register(tracer.export, path)
+
+
+configure_from_env()
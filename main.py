@@ -1,10 +1,53 @@
 """
 Application entry point
 Creates and runs the main Pomodoro application.
+Pass --profile-startup to print where launch time goes.
 """
 
-from gui import PomodoroApp
+import sys
+import time
+from concurrent.futures import wait
+
+from instrumentation import tracer
+
+
+def report_startup(started):
+    """Print the time spent in each startup phase."""
+    spans = tracer.snapshot()['spans']
+    print("Startup profile:", file=sys.stderr)
+    for name, summary in spans.items():
+        if name.startswith("startup."):
+            print(f"  {name[len('startup.'):]:<24}{summary['total'] * 1000:>9.1f} ms", file=sys.stderr)
+    print(f"  {'total':<24}{(time.perf_counter() - started) * 1000:>9.1f} ms", file=sys.stderr)
+    print(f"  bcrypt loaded: {'yes' if 'bcrypt' in sys.modules else 'no'}", file=sys.stderr)
+
+
+def main():
+    """Create the app, optionally profiling its startup, and run it."""
+    started = time.perf_counter()
+    profile = "--profile-startup" in sys.argv[1:]
+    if profile:
+        tracer.enable()
+
+    with tracer.span("startup.import_customtkinter"):
+        import customtkinter  # noqa: F401
+    with tracer.span("startup.import_gui"):
+        from gui import PomodoroApp
+    with tracer.span("startup.create_app"):
+        # When profiling, resume_session is called below instead of from
+        # an idle callback, so the first draw is timed on its own
+        app = PomodoroApp(resume=not profile)
+
+    if profile:
+        with tracer.span("startup.first_draw"):
+            app.root.update()
+        # The database opens on its worker; wait for it so it is in the report
+        opened = app.resume_session()
+        if opened is not None:
+            wait([opened])
+        report_startup(started)
+    app.run()
+
 
 if __name__ == "__main__":
-    app = PomodoroApp()
-    app.run()
\ No newline at end of file
+    main()
@@ -1,16 +1,180 @@
 """
 Data structure definitions for User and Task.
-These are simple data classes for reference only.
+Database reads build these directly, and TaskList stores large numbers of
+tasks in compact parallel arrays.
 """
 
+from array import array
+from bisect import bisect_left
+
+
 class User:
+    """A logged in user."""
+
+    __slots__ = ('id', 'username')
+
     def __init__(self, user_id=None, username=""):
         self.id = user_id
         self.username = username
 
+    def __repr__(self):
+        return f"User(id={self.id!r}, username={self.username!r})"
+
+
 class Task:
-    def __init__(self, task_id=None, title=""):
+    """One todo item, as read from the database."""
+
+    __slots__ = ('id', 'title', 'completed', 'pomodoro_count')
+
+    def __init__(self, task_id=None, title="", completed=False, pomodoro_count=0):
         self.id = task_id
         self.title = title
-        self.completed = False
-        self.pomodoro_count = 0
+        self.completed = bool(completed)
+        self.pomodoro_count = pomodoro_count
+
+    @staticmethod
+    def from_row(cursor, row):
+        """sqlite3 row factory for (id, title, completed, pomodoro_count) rows."""
+        return Task(*row)
+
+    def __eq__(self, other):
+        if not isinstance(other, Task):
+            return NotImplemented
+        return (self.id, self.title, self.completed, self.pomodoro_count) == \
+               (other.id, other.title, other.completed, other.pomodoro_count)
+
+    def __repr__(self):
+        return (f"Task(id={self.id!r}, title={self.title!r}, completed={self.completed!r}, "
+                f"pomodoro_count={self.pomodoro_count!r})")
+
+
+class TaskList:
+    """Tasks kept in parallel arrays instead of one object per task.
+
+    Ids, completion flags and pomodoro counts live in typed arrays, so a
+    stored task costs roughly its title plus 21 bytes. Task objects are only
+    built when an item is read. Filtering and sorting work on the arrays and
+    return new TaskLists.
+    """
+
+    __slots__ = ('ids', 'titles', 'completed', 'pomodoro_counts')
+
+    def __init__(self, tasks=()):
+        """Build a list from Task objects."""
+        self.ids = array('q')
+        self.titles = []
+        self.completed = array('b')
+        self.pomodoro_counts = array('i')
+        for task in tasks:
+            self.append(task)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a list from (id, title, completed, pomodoro_count) tuples."""
+        tasks = cls()
+        for task_id, title, completed, pomodoro_count in rows:
+            tasks.ids.append(task_id)
+            tasks.titles.append(title)
+            tasks.completed.append(1 if completed else 0)
+            tasks.pomodoro_counts.append(pomodoro_count)
+        return tasks
+
+    def append(self, task):
+        """Add a Task at the end."""
+        self.ids.append(task.id)
+        self.titles.append(task.title)
+        self.completed.append(1 if task.completed else 0)
+        self.pomodoro_counts.append(task.pomodoro_count)
+
+    def task(self, index):
+        """Build the Task stored at index."""
+        return Task(self.ids[index], self.titles[index], self.completed[index],
+                    self.pomodoro_counts[index])
+
+    def take(self, indexes):
+        """Return a new TaskList holding the items at the given indexes, in that order."""
+        tasks = TaskList()
+        tasks.ids = array('q', (self.ids[i] for i in indexes))
+        tasks.titles = [self.titles[i] for i in indexes]
+        tasks.completed = array('b', (self.completed[i] for i in indexes))
+        tasks.pomodoro_counts = array('i', (self.pomodoro_counts[i] for i in indexes))
+        return tasks
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        return self.task(index)
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self.task(index)
+
+    def index_of(self, task_id):
+        """Position of task_id, or None. The ids must be in ascending order."""
+        index = bisect_left(self.ids, task_id)
+        if index < len(self.ids) and self.ids[index] == task_id:
+            return index
+        return None
+
+    def put(self, task):
+        """Store task in id order, replacing the task with the same id; True if added."""
+        index = bisect_left(self.ids, task.id)
+        if index < len(self.ids) and self.ids[index] == task.id:
+            self.titles[index] = task.title
+            self.completed[index] = 1 if task.completed else 0
+            self.pomodoro_counts[index] = task.pomodoro_count
+            return False
+        self.ids.insert(index, task.id)
+        self.titles.insert(index, task.title)
+        self.completed.insert(index, 1 if task.completed else 0)
+        self.pomodoro_counts.insert(index, task.pomodoro_count)
+        return True
+
+    def set_completed(self, index, completed=True):
+        """Mark the task at index completed (or not) in place."""
+        self.completed[index] = 1 if completed else 0
+
+    def add_pomodoros(self, index, amount=1):
+        """Add to the pomodoro count of the task at index in place."""
+        self.pomodoro_counts[index] += amount
+
+    def pop(self, index):
+        """Remove and return the task at index."""
+        task = self.task(index)
+        del self.ids[index]
+        del self.titles[index]
+        del self.completed[index]
+        del self.pomodoro_counts[index]
+        return task
+
+    def filter(self, completed=None, title_prefix=None, fold=None):
+        """Return the tasks matching the completion flag and title prefix.
+
+        fold, if given, is applied to the prefix and each title before
+        comparing, e.g. str.lower.
+        """
+        indexes = range(len(self.ids))
+        if completed is not None:
+            flag = 1 if completed else 0
+            flags = self.completed
+            indexes = [i for i in indexes if flags[i] == flag]
+        if title_prefix:
+            titles = self.titles
+            if fold:
+                title_prefix = fold(title_prefix)
+                indexes = [i for i in indexes if fold(titles[i]).startswith(title_prefix)]
+            else:
+                indexes = [i for i in indexes if titles[i].startswith(title_prefix)]
+        if isinstance(indexes, range):
+            return self[:]
+        return self.take(indexes)
+
+    def sort_by(self, field, reverse=False):
+        """Return the tasks sorted by 'pomodoro_count' or 'completed', ties in list order."""
+        values = {'pomodoro_count': self.pomodoro_counts, 'completed': self.completed}[field]
+        # sorted() stays stable with reverse=True, so ties keep their current order
+        indexes = sorted(range(len(self.ids)), key=values.__getitem__, reverse=reverse)
+        return self.take(indexes)
@@ -1,71 +1,246 @@
 """
 Pomodoro timer implementation with work/break sessions.
-Runs in a separate thread to avoid blocking the GUI.
+Counts down against an absolute monotonic deadline so scheduling latency never
+accumulates. Ticks come from one background thread owned by the timer, or from
+a Tk-style after() function when one is supplied.
 """
 
+import logging
+import math
 import threading
 import time
+from collections import deque
+
+from instrumentation import traced, tracer
+
+logger = logging.getLogger(__name__)
+
+
+class TimerEventChannel:
+    """Hands timer events from the timer's thread to the GUI thread.
+
+    post() matches the timer callback signature, so it can be passed straight
+    to set_callback(). deque.append and popleft are atomic, so the timer
+    thread never takes a lock; the GUI empties the channel with drain() from
+    its own event loop.
+    """
+
+    def __init__(self):
+        """Create an empty channel."""
+        self.events = deque()
+
+    def post(self, seconds, session_complete=False):
+        """Queue a tick, or a session-complete event if session_complete is set."""
+        self.events.append((seconds, session_complete))
+
+    def drain(self):
+        """Take all queued events, keeping only the latest of consecutive ticks."""
+        drained = []
+        while True:
+            try:
+                event = self.events.popleft()
+            except IndexError:
+                return drained
+            # A tick followed by another tick is stale; completions are always kept
+            if drained and not drained[-1][1] and not event[1]:
+                drained[-1] = event
+            else:
+                drained.append(event)
 
 
 class PomodoroTimer:
     """Manages the Pomodoro technique timer with work and break intervals."""
 
-    def __init__(self):
-        """Initialize timer with default work/break durations."""
+    def __init__(self, clock=time.monotonic, after=None):
+        """Initialize timer with default work/break durations.
+
+        clock returns the current time in seconds and can be replaced for
+        testing; with a fake clock, advance it and call tick() to step the
+        timer without waiting. after(ms, func, *args), such as root.after,
+        drives ticks from an event loop instead of a background thread.
+        """
         self.work_time = 25*60
         self.break_time = 5*60
-        self.current_time = self.work_time
         self.is_running = False
         self.is_work_session = True
         self.callback = None
 
+        self.clock = clock
+        self.after = after
+        self.remaining = float(self.work_time)  # Seconds left while paused
+        self.deadline = None  # clock() value at which the running session ends
+        self.last_reported = None  # Last whole-second value passed to callback
+        self.generation = 0  # Bumped on start/pause so stale after() ticks are ignored
+        self.condition = threading.Condition(threading.RLock())
+        self.thread = None
+
+    @property
+    def current_time(self):
+        """Whole seconds left in the current session, rounded up."""
+        return math.ceil(self.remaining_time())
+
+    @current_time.setter
+    def current_time(self, seconds):
+        with self.condition:
+            self.remaining = float(seconds)
+            if self.is_running:
+                self.deadline = self.clock() + self.remaining
+                self.condition.notify()
+
+    def remaining_time(self):
+        """Exact seconds left in the current session, computed from the deadline."""
+        with self.condition:
+            if self.is_running:
+                return max(0.0, self.deadline - self.clock())
+            return self.remaining
+
     def start(self):
-        """Start the timer in a background thread."""
-        if not self.is_running:
+        """Start or resume the countdown."""
+        with self.condition:
+            if self.is_running:
+                return
             self.is_running = True
-            thread = threading.Thread(target=self.run_timer)
-            thread.daemon = True
-            thread.start()
+            self.deadline = self.clock() + self.remaining
+            self.last_reported = None
+            self.generation += 1
+
+            if self.after is not None:
+                self.schedule(0)
+            else:
+                self.ensure_thread()
+                self.condition.notify()
 
     def pause(self):
-        """Pause the running timer."""
-        self.is_running = False
+        """Pause the running timer, keeping the exact time left."""
+        with self.condition:
+            if self.is_running:
+                self.remaining = max(0.0, self.deadline - self.clock())
+            self.is_running = False
+            self.deadline = None
+            self.generation += 1
+            self.condition.notify()
 
     def reset(self):
         """Reset timer to initial work session state."""
-        self.is_running = False
-        self.is_work_session = True
-        self.current_time = self.work_time
+        with self.condition:
+            self.is_running = False
+            self.is_work_session = True
+            self.remaining = float(self.work_time)
+            self.deadline = None
+            self.generation += 1
+            self.condition.notify()
         if self.callback:
             self.callback(self.current_time)
 
+    @traced("timer.tick")
+    def tick(self):
+        """Report the time left and finish the session once its deadline passes.
+
+        Returns the delay in seconds until the displayed second next changes,
+        or None if the timer is not running.
+        """
+        with self.condition:
+            if not self.is_running:
+                return None
+
+            remaining = self.deadline - self.clock()
+            if remaining <= 0:
+                self.is_running = False
+                self.deadline = None
+                self.remaining = 0.0
+                if self.callback and self.last_reported != 0:
+                    self.callback(0)
+                self.session_complete()
+                return None
+
+            seconds = math.ceil(remaining)
+            if seconds != self.last_reported:
+                self.last_reported = seconds
+                if self.callback:
+                    self.callback(seconds)
+            # Wake exactly when the next whole second is crossed
+            return remaining - (seconds - 1)
+
+    def checkpoint(self, now=None):
+        """Return (is_work_session, remaining, deadline) for saving the timer.
+
+        remaining is the exact seconds left. deadline is the wall-clock time
+        (time.time(), or now) at which a running session ends, or None when
+        the timer is stopped; unlike the monotonic deadline it survives a
+        restart.
+        """
+        with self.condition:
+            remaining = self.remaining_time()
+            if not self.is_running:
+                return self.is_work_session, remaining, None
+            return self.is_work_session, remaining, (time.time() if now is None else now) + remaining
+
+    def restore(self, is_work_session, remaining, deadline=None, now=None):
+        """Load a checkpoint() result; a deadline still ahead keeps counting down.
+
+        If the saved session ran out in the meantime, the timer is left
+        stopped at the start of the next one, as session_complete() would
+        leave it but without calling back, and the type of the finished
+        session ("work" or "break") is returned. Otherwise returns None.
+        """
+        with self.condition:
+            self.is_running = False
+            self.deadline = None
+            self.generation += 1
+            self.is_work_session = is_work_session
+            self.remaining = float(remaining)
+            self.condition.notify()
+
+            if deadline is None:
+                return None
+            left = deadline - (time.time() if now is None else now)
+            if left > 0:
+                self.remaining = left
+                self.start()
+                return None
+
+            self.is_work_session = not is_work_session
+            self.remaining = float(self.work_time if self.is_work_session else self.break_time)
+            return "work" if is_work_session else "break"
+
+    def ensure_thread(self):
+        """Start the timer's scheduler thread if it isn't running yet."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run_timer, daemon=True)
+            self.thread.start()
+
     def run_timer(self):
-        """Main timer loop that counts down and handles session transitions."""
-        while self.is_running and self.current_time > 0:
-            time.sleep(1)
-            self.current_time -= 1
-            if self.callback:
-                self.callback(self.current_time)
+        """Scheduler thread loop: sleep until the next deadline-derived tick."""
+        with self.condition:
+            while True:
+                delay = self.tick()
+                # Sleeps until the next tick, or until start/pause/reset notifies
+                self.condition.wait(delay)
 
-        if self.current_time == 0:
-            self.session_complete()
+    def schedule(self, delay):
+        """Queue the next tick with after(), rounding up so it never fires early."""
+        self.after(max(1, math.ceil(delay * 1000)), self.after_tick, self.generation)
+
+    def after_tick(self, generation):
+        """Tick callback for after() mode; ignores ticks from an earlier start."""
+        if generation != self.generation:
+            return
+        delay = self.tick()
+        if delay is not None:
+            self.schedule(delay)
 
     def session_complete(self):
         """Switch between work and break sessions when timer reaches zero."""
-        # Debug print to see what's happening
-        print(f"[TIMER DEBUG] Session complete. Current is_work_session={self.is_work_session}")
-
         # Store the session type that just completed (BEFORE switching)
         completed_session_type = "work" if self.is_work_session else "break"
-        print(f"[TIMER DEBUG] Completed session type: {completed_session_type}")
+        logger.debug("Session complete: %s", completed_session_type)
+        tracer.count(f"timer.session_complete.{completed_session_type}")
 
         # Switch to the next session
         self.is_work_session = not self.is_work_session
-        self.current_time = self.break_time if not self.is_work_session else self.work_time
+        self.remaining = float(self.break_time if not self.is_work_session else self.work_time)
 
         if self.callback:
-            print(
-                f"[TIMER DEBUG] Calling callback with: seconds={self.current_time}, session_type={completed_session_type}")
             # Send the completed session type to the callback
             self.callback(self.current_time, completed_session_type)
 
@@ -0,0 +1,283 @@
+"""
+Headless multi-user Pomodoro timer service.
+Runs every user's timer from one asyncio loop backed by a hierarchical timing
+wheel and serves start/pause/reset/status over a local JSON-lines socket.
+
+Each request is one JSON object per line, e.g. {"cmd": "login", "username":
+"...", "password": "..."} or {"cmd": "start"}; each reply is one JSON object
+with "ok" set and either the result fields or an "error" message.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+
+from async_database import AsyncDatabase
+from auth import AuthManager
+from database import Database, open_storage
+from timing_wheel import HierarchicalTimingWheel
+
+TICK = 0.1  # Seconds per timing wheel tick
+
+logger = logging.getLogger(__name__)
+
+
+class UserTimer:
+    """Timer state for one user: a deadline while running, time left while paused."""
+
+    __slots__ = ('user_id', 'is_work_session', 'remaining', 'deadline', 'handle', 'task_id')
+
+    def __init__(self, user_id, work_time):
+        self.user_id = user_id
+        self.is_work_session = True
+        self.remaining = float(work_time)
+        self.deadline = None
+        self.handle = None
+        self.task_id = None
+
+
+class TimerService:
+    """Drives the timers of every connected user from a single event loop."""
+
+    def __init__(self, db=None, work_time=25*60, break_time=5*60, tick=TICK):
+        """Initialize the service with a shared write-behind database."""
+        self.db = db if db is not None else Database(write_behind=True, storage=open_storage())
+        # Every SQL call runs here, so a slow or locked database never
+        # stalls the event loop and the timers on it
+        self.worker = AsyncDatabase(self.db)
+        self.work_time = work_time
+        self.break_time = break_time
+        self.tick = tick
+        self.wheel = HierarchicalTimingWheel()
+        self.timers = {}  # user id -> UserTimer
+        self.loop = None
+        self.epoch = None  # loop.time() at wheel tick 0
+
+    def now(self):
+        """Current loop time."""
+        return self.loop.time()
+
+    def get_timer(self, user_id):
+        """Return the user's timer, creating it on first use."""
+        timer = self.timers.get(user_id)
+        if timer is None:
+            timer = UserTimer(user_id, self.work_time)
+            self.timers[user_id] = timer
+        return timer
+
+    def start(self, user_id):
+        """Start or resume the user's countdown."""
+        timer = self.get_timer(user_id)
+        if timer.deadline is None:
+            timer.deadline = self.now() + timer.remaining
+            # Round up so the timer never fires before its deadline
+            ticks = -(-(timer.deadline - self.epoch) // self.tick) - self.wheel.current
+            timer.handle = self.wheel.schedule(ticks, self.session_complete, timer)
+        return self.status(user_id)
+
+    def pause(self, user_id):
+        """Pause the user's countdown, keeping the time left."""
+        timer = self.get_timer(user_id)
+        if timer.deadline is not None:
+            timer.remaining = max(0.0, timer.deadline - self.now())
+            timer.deadline = None
+            self.wheel.cancel(timer.handle)
+            timer.handle = None
+        return self.status(user_id)
+
+    def reset(self, user_id):
+        """Stop the user's timer and return to a fresh work session."""
+        self.pause(user_id)
+        timer = self.get_timer(user_id)
+        timer.is_work_session = True
+        timer.remaining = float(self.work_time)
+        return self.status(user_id)
+
+    async def set_task(self, user_id, task_id):
+        """Choose the task that completed work sessions are credited to.
+
+        task_id must be one of the user's own tasks, or None to credit none.
+        """
+        if task_id is not None:
+            if not isinstance(task_id, int) or isinstance(task_id, bool):
+                raise ValueError(f"Invalid task id: {task_id!r}")
+            owned = await asyncio.wrap_future(self.worker.submit(self.db.owns_task, user_id, task_id))
+            if not owned:
+                raise ValueError(f"No such task: {task_id}")
+        self.get_timer(user_id).task_id = task_id
+        return self.status(user_id)
+
+    def status(self, user_id):
+        """Describe the user's timer as a JSON-ready dict."""
+        timer = self.get_timer(user_id)
+        running = timer.deadline is not None
+        remaining = max(0.0, timer.deadline - self.now()) if running else timer.remaining
+        return {
+            'running': running,
+            'session': 'work' if timer.is_work_session else 'break',
+            'remaining': round(remaining, 3),
+            'task_id': timer.task_id,
+        }
+
+    def session_complete(self, timer):
+        """Wheel callback: switch to the next session and queue the finished one's writes.
+
+        It never raises: the wheel fires every timer due on a tick in one
+        call, so an error here would cost the other users' timers too.
+        """
+        completed = 'work' if timer.is_work_session else 'break'
+        duration = self.work_time if timer.is_work_session else self.break_time
+        task_id = timer.task_id if completed == 'work' else None
+
+        timer.is_work_session = not timer.is_work_session
+        timer.remaining = float(self.work_time if timer.is_work_session else self.break_time)
+        timer.deadline = None
+        timer.handle = None
+
+        try:
+            future = self.worker.submit(self.db.finish_session, timer.user_id, completed, duration, task_id)
+            future.add_done_callback(self.check_recorded)
+        except Exception:
+            logger.exception("Couldn't queue the %s session of user %s", completed, timer.user_id)
+
+    def check_recorded(self, future):
+        """Log a session that couldn't be written; the timer has moved on regardless."""
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Couldn't record a finished session", exc_info=exc)
+
+    async def run_wheel(self):
+        """Advance the wheel in step with the loop clock, catching up after stalls."""
+        while True:
+            target = int((self.now() - self.epoch) / self.tick)
+            while self.wheel.current < target:
+                self.wheel.advance()
+            next_tick = self.epoch + (self.wheel.current + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_tick - self.now()))
+
+    async def handle_client(self, reader, writer):
+        """Serve one client connection; each connection logs in as one user."""
+        auth = AuthManager(self.db, worker=self.worker)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    reply = await self.handle_request(auth, request)
+                except Exception as exc:
+                    reply = {'ok': False, 'error': str(exc)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_request(self, auth, request):
+        """Run one command for the connection's AuthManager and build the reply."""
+        cmd = request.get('cmd')
+        if cmd == 'login':
+            # bcrypt is slow; keep it off the event loop
+            success, msg = await self.loop.run_in_executor(
+                None, auth.login, request.get('username', ''), request.get('password', ''))
+            return {'ok': success, 'message': msg}
+
+        if not auth.is_authenticated():
+            return {'ok': False, 'error': 'Not logged in'}
+        user_id = auth.get_current_user_id()
+
+        if cmd == 'start':
+            return dict(ok=True, **self.start(user_id))
+        if cmd == 'pause':
+            return dict(ok=True, **self.pause(user_id))
+        if cmd == 'reset':
+            return dict(ok=True, **self.reset(user_id))
+        if cmd == 'status':
+            return dict(ok=True, **self.status(user_id))
+        if cmd == 'set_task':
+            return dict(ok=True, **await self.set_task(user_id, request.get('task_id')))
+        if cmd == 'logout':
+            auth.logout()
+            return {'ok': True}
+        return {'ok': False, 'error': f'Unknown command: {cmd}'}
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """Run the service until cancelled."""
+        self.loop = asyncio.get_running_loop()
+        self.epoch = self.now()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        wheel_task = asyncio.create_task(self.run_wheel())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            wheel_task.cancel()
+            # Waits for the queued writes, then flushes
+            self.worker.close()
+
+
+class TimerClient:
+    """Blocking client for TimerService, e.g. for the GUI or scripts."""
+
+    def __init__(self, host='127.0.0.1', port=8765, timeout=5.0):
+        """Connect to a running service."""
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, cmd, **params):
+        """Send a command and return the decoded reply."""
+        self.file.write(json.dumps(dict(cmd=cmd, **params)).encode() + b'\n')
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def login(self, username, password):
+        """Log this connection in; returns (success, message)."""
+        reply = self.request('login', username=username, password=password)
+        return reply['ok'], reply.get('message', reply.get('error'))
+
+    def start(self):
+        """Start or resume the timer."""
+        return self.request('start')
+
+    def pause(self):
+        """Pause the timer."""
+        return self.request('pause')
+
+    def reset(self):
+        """Reset the timer to a fresh work session."""
+        return self.request('reset')
+
+    def status(self):
+        """Fetch the timer's current state."""
+        return self.request('status')
+
+    def set_task(self, task_id):
+        """Credit completed work sessions to task_id."""
+        return self.request('set_task', task_id=task_id)
+
+    def close(self):
+        """Close the connection."""
+        self.file.close()
+        self.sock.close()
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Headless Pomodoro timer service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', help="storage spec: a file path, 'sharded:DIR' or 'memory' "
+                                      "(default: $POMODORO_STORAGE or pomodoro.db)")
+    args = parser.parse_args()
+
+    service = TimerService(Database(write_behind=True, storage=open_storage(args.db)))
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+In-memory task cache in front of the database.
+Keeps each recently used user's tasks in memory as compact TaskLists, writes
+through to SQLite, and evicts least recently used users to stay within a row budget.
+"""
+
+import string
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+
+from database import Database, TASK_PAGE_SIZE
+from instrumentation import tracer
+from models import Task
+
+MAX_CACHED_USERS = 64
+MAX_CACHED_ROWS = 200000
+
+# SQLite's LIKE only folds ASCII letters; prefix matching here does the same
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class CachedDatabase(Database):
+    """Database whose task reads are served from memory after the first load.
+
+    Each cached user's tasks are held in a TaskList ordered by id. A user
+    is loaded by the first full read (get_user_tasks, get_task_list,
+    iter_user_tasks) or by preload(); until then pages come from SQL, so
+    opening a long list never waits for all of it to be read. Writes
+    made elsewhere, by other connections or by other Database objects on
+    this connection, are noticed on the next read, and only the tasks they
+    touched are fetched again. This object's own writes are applied to the
+    cached lists directly and don't cause a sync.
+    """
+
+    def __init__(self, db_name="pomodoro.db", max_users=MAX_CACHED_USERS,
+                 max_rows=MAX_CACHED_ROWS, **kwargs):
+        """Initialize the database and an empty cache with the given budget."""
+        super().__init__(db_name, **kwargs)
+        self.max_users = max_users
+        self.max_rows = max_rows
+        self.cache = OrderedDict()  # user id -> TaskList, least recent first
+        self.revisions = {}  # user id -> task revision the cached list is current to
+        self.oversized = {}  # user id -> task revision when found too big to cache
+        self.synced_version = None  # change_token() at the last sync, moved past our own writes
+        self.cached_row_count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def cache_stats(self):
+        """Return hit/miss counters and current cache size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'users': len(self.cache),
+            'rows': self.cached_row_count,
+        }
+
+    def cached_tasks(self, user_id, load=True):
+        """Return the user's cached TaskList, loading it on a miss if load is set.
+
+        Returns None on a miss without load, and for a user with more tasks
+        than the whole row budget; those reads go straight to the database.
+        A user found too big isn't read again until their tasks change.
+        """
+        self.sync_changes()
+        tasks = self.cache.get(user_id)
+        if tasks is not None:
+            self.hits += 1
+            tracer.count("cache.hit")
+            self.cache.move_to_end(user_id)
+            return tasks
+
+        self.misses += 1
+        tracer.count("cache.miss")
+        if not load or user_id in self.oversized:
+            return None
+        # Read the revision before the rows; a write landing in between is
+        # fetched again by the next sync, which is harmless
+        revision = self.task_revision(user_id)
+        # Read one past the budget to spot users too big to cache
+        tasks = super().get_task_list(user_id, limit=self.max_rows + 1)
+        if len(tasks) > self.max_rows:
+            self.oversized[user_id] = revision
+            return None
+
+        self.cache[user_id] = tasks
+        self.revisions[user_id] = revision
+        self.cached_row_count += len(tasks)
+        self.evict()
+        return tasks
+
+    def preload(self, user_id):
+        """Load the user's tasks into the cache ahead of use; True if they fit.
+
+        Meant to run in the background, e.g. queued on the database worker
+        behind the first page.
+        """
+        return self.cached_tasks(user_id) is not None
+
+    def sync_changes(self):
+        """Apply writes committed by other connections to the cached lists.
+
+        Costs one PRAGMA per open file when nothing was written. Otherwise
+        each cached user's revision is checked and only tasks written since
+        are re-read. Any of this object's own writes since the last sync are
+        re-read too, which just confirms what is cached. Users found too big
+        to cache are tried again once their revision has moved.
+        """
+        version = self.change_token()
+        if version == self.synced_version:
+            return
+        self.synced_version = version
+        for user_id, tasks in self.cache.items():
+            revision, changed, deleted_ids = self.task_changes(user_id, self.revisions[user_id])
+            if revision == self.revisions[user_id]:
+                continue
+            tracer.count("cache.sync")
+            for task_id in deleted_ids:
+                index = tasks.index_of(task_id)
+                if index is not None:
+                    tasks.pop(index)
+                    self.cached_row_count -= 1
+            for task in changed:
+                if tasks.put(task):
+                    self.cached_row_count += 1
+            self.revisions[user_id] = revision
+        for user_id, revision in list(self.oversized.items()):
+            if self.task_revision(user_id) != revision:
+                del self.oversized[user_id]
+        self.evict()
+
+    @contextmanager
+    def writing(self, conn=None):
+        """Run one of this object's own mutations, as Database.writing does.
+
+        Every task write made here is applied to the cached lists by the
+        method making it, so a cache in sync before the write is still in
+        sync after it: the token is moved past the write instead of leaving
+        the next read to find it and re-sync.
+        """
+        with super().writing(conn) as cursor:
+            # Checked under the storage lock, so no other write can land in between
+            in_sync = self.synced_version is not None and self.synced_version[1] == self.local_changes()
+            yield cursor
+            if in_sync:
+                self.synced_version = self.synced_version[0], self.local_changes()
+
+    def poll_changes(self, user_id, seen=None):
+        """Check for writes by other connections, bringing the cache up to date first."""
+        self.sync_changes()
+        return super().poll_changes(user_id, seen)
+
+    def locate(self, task_id):
+        """Return (TaskList, index) of a cached task, or (None, None).
+
+        Only lists whose id range spans task_id are bisected. A per-task
+        owner map would cost more memory than the TaskLists themselves.
+        """
+        for tasks in self.cache.values():
+            if tasks.ids and tasks.ids[0] <= task_id <= tasks.ids[-1]:
+                index = tasks.index_of(task_id)
+                if index is not None:
+                    return tasks, index
+        return None, None
+
+    def evict(self):
+        """Drop least recently used users until the cache is within budget."""
+        while len(self.cache) > 1 and (len(self.cache) > self.max_users
+                                       or self.cached_row_count > self.max_rows):
+            user_id = next(iter(self.cache))
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id=None):
+        """Forget one user's cached tasks, or everyone's."""
+        if user_id is None:
+            self.cache.clear()
+            self.revisions.clear()
+            self.oversized.clear()
+            self.cached_row_count = 0
+            return
+        self.revisions.pop(user_id, None)
+        self.oversized.pop(user_id, None)
+        tasks = self.cache.pop(user_id, None)
+        if tasks is not None:
+            self.cached_row_count -= len(tasks)
+
+    def matching_tasks(self, tasks, status, prefix, order):
+        """Apply task_query's filters and ordering to a cached TaskList."""
+        completed = None if status is None else status == 'completed'
+        tasks = tasks.filter(completed, prefix, fold=lambda text: text.translate(ASCII_LOWER))
+        if order == 'pomodoros':
+            tasks = tasks.sort_by('pomodoro_count', reverse=True)
+        elif order != 'id':
+            raise ValueError(f"Unknown task order: {order}")
+        return tasks
+
+    def get_user_tasks(self, user_id):
+        """Retrieve all tasks belonging to a specific user."""
+        tasks = self.cached_tasks(user_id)
+        if tasks is None:
+            return super().get_user_tasks(user_id)
+        return list(tasks)
+
+    def get_task_list(self, user_id, limit=None):
+        """Return a user's tasks as a TaskList, ordered by id."""
+        tasks = self.cached_tasks(user_id)
+        if tasks is None:
+            return super().get_task_list(user_id, limit)
+        return tasks[:limit]
+
+    def get_task_page(self, user_id, status=None, prefix=None, order='id', cursor=None,
+                      limit=TASK_PAGE_SIZE):
+        """Return (tasks, next_cursor) for one page, as Database.get_task_page does.
+
+        Served from memory once the user is cached; a page never loads the
+        cache itself.
+        """
+        tasks = self.cached_tasks(user_id, load=False)
+        if tasks is None:
+            return super().get_task_page(user_id, status, prefix, order, cursor, limit)
+
+        if order == 'id' and status is None and not prefix:
+            # The common case needs no filtering: jump to the cursor by bisection
+            start = 0 if cursor is None else bisect_right(tasks.ids, cursor[0])
+            page = list(tasks[start:start + limit + 1])
+        else:
+            matches = iter(self.matching_tasks(tasks, status, prefix, order))
+            if cursor is not None:
+                if order == 'pomodoros':
+                    after = (-cursor[0], cursor[1])
+                    matches = (task for task in matches if (-task.pomodoro_count, task.id) > after)
+                else:
+                    matches = (task for task in matches if task.id > cursor[0])
+            page = list(islice(matches, limit + 1))
+
+        if len(page) > limit:
+            page = page[:limit]
+            return page, self.task_cursor(page[-1], order)
+        return page, None
+
+    def iter_user_tasks(self, user_id, status=None, prefix=None, order='id', batch_size=500):
+        """Yield a user's tasks, from memory when cached."""
+        tasks = self.cached_tasks(user_id)
+        if tasks is None:
+            yield from super().iter_user_tasks(user_id, status, prefix, order, batch_size)
+            return
+        yield from self.matching_tasks(tasks, status, prefix, order)
+
+    def add_task(self, user_id, title):
+        """Add a new task for a specific user."""
+        task_id = super().add_task(user_id, title)
+        tasks = self.cache.get(user_id)
+        if tasks is not None:
+            # New ids are always the largest, so the list stays sorted
+            tasks.append(Task(task_id, title))
+            self.cached_row_count += 1
+            self.evict()
+        return task_id
+
+    def add_tasks(self, user_id, tasks):
+        """Insert many tasks; the user's cache is reloaded on next read."""
+        count = super().add_tasks(user_id, tasks)
+        self.invalidate(user_id)
+        return count
+
+    def complete_task(self, task_id):
+        """Mark a task as completed."""
+        super().complete_task(task_id)
+        tasks, index = self.locate(task_id)
+        if tasks is not None:
+            tasks.set_completed(index)
+
+    def increment_pomodoro(self, task_id):
+        """Increase the pomodoro count for a task."""
+        super().increment_pomodoro(task_id)
+        tasks, index = self.locate(task_id)
+        if tasks is not None:
+            tasks.add_pomodoros(index)
+
+    def finish_session(self, user_id, session_type, duration, task_id=None, ended_at=None):
+        """Log a finished session, crediting task_id a pomodoro for work."""
+        session_id = super().finish_session(user_id, session_type, duration, task_id, ended_at)
+        tasks = self.cache.get(user_id)
+        if session_type == "work" and task_id is not None and tasks is not None:
+            # Only the user's own task was credited, so look in their list alone
+            index = tasks.index_of(task_id)
+            if index is not None:
+                tasks.add_pomodoros(index)
+        return session_id
+
+    def delete_task(self, task_id):
+        """Delete a task from the database."""
+        super().delete_task(task_id)
+        tasks, index = self.locate(task_id)
+        if tasks is not None:
+            tasks.pop(index)
+            self.cached_row_count -= 1
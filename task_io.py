@@ -0,0 +1,195 @@
+"""
+Bulk task import and export in CSV, JSON Lines or a JSON array.
+Both directions stream, so memory use stays flat however large the file is.
+
+Usage:
+    python task_io.py import USERNAME tasks.csv
+    python task_io.py export USERNAME tasks.jsonl
+    python task_io.py export USERNAME tasks.json
+"""
+
+import argparse
+import csv
+import functools
+import itertools
+import json
+import os
+import sys
+
+from database import Database, open_storage
+
+IMPORT_BATCH_SIZE = 5000
+EXPORT_FIELDS = ['id', 'title', 'completed', 'pomodoro_count']
+FORMATS = ['csv', 'jsonl', 'json']
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def detect_format(path, fmt=None):
+    """Return 'csv', 'jsonl' or 'json', from fmt if given, else from the file extension."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext == '.json':
+        return 'json'
+    raise ValueError(f"Can't tell the format of {path}; pass csv, jsonl or json explicitly")
+
+
+def read_records(file, fmt):
+    """Yield one dict per task from an open CSV, JSON Lines or JSON array file."""
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+    elif fmt == 'json':
+        yield from read_json_array(file)
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_json_array(file):
+    """Yield the task objects of a JSON array, reading the file a chunk at a time."""
+    decoder = json.JSONDecoder()
+    chunks = iter(functools.partial(file.read, READ_CHUNK_SIZE), '')
+    buffer = ''
+
+    def peek():
+        """Drop leading whitespace and return the next character, or '' at the end."""
+        nonlocal buffer
+        buffer = buffer.lstrip()
+        while not buffer:
+            buffer = next(chunks, None)
+            if buffer is None:
+                buffer = ''
+                return ''
+            buffer = buffer.lstrip()
+        return buffer[0]
+
+    if peek() != '[':
+        raise ValueError("Expected a JSON array of tasks")
+    buffer = buffer[1:]
+    if peek() != ']':
+        while True:
+            if peek() != '{':
+                raise ValueError(f"Expected a task object, found {buffer[:20]!r}")
+            # An object missing its closing brace never decodes, so read on until it does
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer)
+                    break
+                except json.JSONDecodeError:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        raise
+                    buffer += chunk
+            yield record
+            buffer = buffer[end:]
+            if peek() == ']':
+                break
+            if peek() != ',':
+                raise ValueError(f"Expected ',' or ']', found {buffer[:20]!r}")
+            buffer = buffer[1:]
+    buffer = buffer[1:]
+    if peek():
+        raise ValueError("Unexpected data after the JSON array")
+
+
+def to_row(record):
+    """Turn an imported record into a (title, completed, pomodoro_count) row."""
+    title = (record.get('title') or '').strip()
+    if not title:
+        raise ValueError(f"Task without a title: {record}")
+    completed = record.get('completed') or 0
+    if isinstance(completed, str):
+        completed = completed.strip().lower() in ('1', 'true', 'yes')
+    return title, 1 if completed else 0, int(record.get('pomodoro_count') or 0)
+
+
+def import_tasks(db, user_id, path, fmt=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Add every task in path to user_id's list; returns the number imported.
+
+    Rows are inserted batch_size at a time, each batch in one transaction.
+    progress(count) is called after every batch.
+    """
+    fmt = detect_format(path, fmt)
+    total = 0
+    # utf-8-sig drops the byte order mark Excel writes at the start of a CSV
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        rows = map(to_row, read_records(file, fmt))
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            db.add_tasks(user_id, batch)
+            total += len(batch)
+            if progress:
+                progress(total)
+    db.flush()
+    return total
+
+
+def export_tasks(db, user_id, path, fmt=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Write all of user_id's tasks to path; returns the number exported.
+
+    Rows are streamed from the database cursor. progress(count) is called
+    every batch_size rows and once at the end.
+    """
+    fmt = detect_format(path, fmt)
+    total = 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(EXPORT_FIELDS)
+        elif fmt == 'json':
+            file.write('[')
+        for task in db.iter_user_tasks(user_id, batch_size=batch_size):
+            row = (task.id, task.title, int(task.completed), task.pomodoro_count)
+            if writer:
+                writer.writerow(row)
+            else:
+                record = json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False)
+                if fmt == 'json':
+                    # The array is written one element at a time, never built in memory
+                    file.write(('\n  ' if total == 0 else ',\n  ') + record)
+                else:
+                    file.write(record + '\n')
+            total += 1
+            if progress and total % batch_size == 0:
+                progress(total)
+        if fmt == 'json':
+            file.write('\n]\n' if total else ']\n')
+    if progress:
+        progress(total)
+    return total
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Import or export Pomodoro tasks")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('username')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=FORMATS)
+    parser.add_argument('--db', help="storage spec: a file path, 'sharded:DIR' or 'memory' "
+                                      "(default: $POMODORO_STORAGE or pomodoro.db)")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = Database(storage=open_storage(args.db))
+    user_id = db.get_user_id(args.username)
+    if user_id is None:
+        parser.error(f"No such user: {args.username}")
+
+    def progress(count):
+        print(f"\r{count} tasks", end='', file=sys.stderr, flush=True)
+
+    run = import_tasks if args.command == 'import' else export_tasks
+    total = run(db, user_id, args.path, args.format, args.batch_size, progress)
+    print(f"\r{args.command.capitalize()}ed {total} tasks", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
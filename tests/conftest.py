@@ -0,0 +1,17 @@
+"""
+Fixtures shared by the test modules.
+Run the suite with `python -m pytest` from the repository root.
+"""
+
+import os
+
+import pytest
+
+from database import ConnectionManager
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = os.path.join(str(tmp_path), "test.db")
+    yield path
+    ConnectionManager.close(path)
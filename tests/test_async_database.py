@@ -0,0 +1,48 @@
+"""
+Behaviour checks for AsyncDatabase, the worker thread behind the GUI's
+database calls.
+"""
+
+import logging
+import sqlite3
+import threading
+
+import pytest
+
+from async_database import AsyncDatabase
+from database import Database, MemoryStorage
+
+
+def test_calls_run_in_order_and_failures_stay_on_the_future(caplog):
+    worker = AsyncDatabase(Database(storage=MemoryStorage()))
+    results = []
+    first = worker.submit(worker.db.add_task, 1, "first", callback=results.append)
+    worker.submit(worker.db.add_task, 1, "second", callback=results.append)
+    assert [task.id for task in worker.call(worker.db.get_user_tasks, 1)] == results
+    assert results[0] == first.result()
+
+    worker.call(worker.db.insert_user, "alice", b"hash")
+    with caplog.at_level(logging.INFO):
+        with pytest.raises(sqlite3.IntegrityError):
+            worker.call(worker.db.insert_user, "alice", b"hash")
+    # A taken username is an expected failure; its caller reports it
+    assert not caplog.records
+    worker.close()
+
+
+def test_open_builds_the_database_on_the_worker():
+    worker = AsyncDatabase()
+    opened_on = []
+
+    def factory():
+        opened_on.append(threading.current_thread().name)
+        return Database(storage=MemoryStorage())
+
+    delivered = []
+    future = worker.open(factory, callback=delivered.append)
+    # Calls queued behind open() already see the new database
+    task_id = worker.call(lambda: worker.db.add_task(1, "first"))
+    assert delivered == [future.result()] and worker.db is future.result()
+    assert opened_on[0].startswith("database") and opened_on[0] != threading.current_thread().name
+    assert worker.call(worker.db.get_user_tasks, 1)[0].id == task_id
+    worker.close()
@@ -0,0 +1,82 @@
+"""
+Behaviour checks for AuthManager's logins and remember-me sessions. Session
+tests log users in by setting current_user; the one password test hashes at
+bcrypt's minimum cost.
+"""
+
+import os
+import queue
+import stat
+
+import pytest
+
+from async_database import AsyncDatabase
+from auth import AuthManager, hash_token
+from database import Database, MemoryStorage, hash_password
+from models import User
+
+
+def test_login_async_dispatches_result_and_rehashes(tmp_path):
+    pytest.importorskip("bcrypt")
+    db = Database(storage=MemoryStorage())
+    db.insert_user("alice", hash_password("secret1", 5))
+    worker = AsyncDatabase(db)
+    auth = AuthManager(db, bcrypt_rounds=4, session_file=os.path.join(str(tmp_path), "session"),
+                       worker=worker)
+    dispatched = queue.Queue()
+
+    def dispatch(callback, *result):
+        dispatched.put((callback, result))
+
+    def on_login(success, message):
+        pass
+
+    auth.login_async("alice", "wrong password", on_login, dispatch)
+    assert dispatched.get(timeout=10) == (on_login, (False, "Invalid username or password"))
+    assert db.hash_rounds(db.get_password_hash("alice")[1]) == 5
+
+    auth.login_async("alice", "secret1", on_login, dispatch)
+    assert dispatched.get(timeout=10) == (on_login, (True, "Login successful!"))
+    # The cost-5 hash was replaced by one at the configured cost, and still verifies
+    assert db.hash_rounds(db.get_password_hash("alice")[1]) == 4
+    assert db.verify_user("alice", "secret1") is not None
+    worker.close()
+
+
+def test_remember_me_session_round_trip(tmp_path):
+    db = Database(storage=MemoryStorage())
+    user_id = db.insert_user("alice", b"hash")
+    session_file = os.path.join(str(tmp_path), "session")
+
+    auth = AuthManager(db, session_file=session_file)
+    auth.current_user = User(user_id, "alice")
+    auth.remember_session()
+    assert stat.S_IMODE(os.stat(session_file).st_mode) == 0o600
+    with open(session_file) as file:
+        token = file.read()
+    # Only the token's hash is stored
+    assert db.conn.execute("SELECT token_hash FROM sessions").fetchall() == [(hash_token(token),)]
+
+    relaunched = AuthManager(db, session_file=session_file)
+    assert relaunched.resume_session() == (True, "Welcome back!")
+    assert relaunched.current_user.username == "alice"
+
+    relaunched.logout()
+    assert not os.path.exists(session_file)
+    with open(session_file, 'w') as file:
+        file.write(token)  # A copy of the revoked token no longer works
+    assert AuthManager(db, session_file=session_file).resume_session() == (False, "Saved session expired")
+    assert not os.path.exists(session_file)
+    assert AuthManager(db, session_file=session_file).resume_session() == (False, "No saved session")
+
+
+def test_expired_sessions_are_refused_and_pruned():
+    db = Database(storage=MemoryStorage())
+    user_id = db.insert_user("alice", b"hash")
+    db.create_session(user_id, hash_token("old"), expires_at=1.0)
+    db.create_session(user_id, hash_token("live"), expires_at=4e9)
+
+    assert db.get_session_user(hash_token("old")) is None
+    assert db.get_session_user(hash_token("live")) == (user_id, "alice")
+    assert db.prune_sessions(batch_size=1) == 1
+    assert db.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 1
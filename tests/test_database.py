@@ -0,0 +1,227 @@
+"""
+Behaviour checks for Database queries and writes, on private in-memory or
+temporary databases.
+"""
+
+import datetime
+import os
+import random
+import sqlite3
+
+import pytest
+
+import database
+from database import (MIGRATIONS, SCHEMA_VERSION, SHARD_ID_BITS, ConnectionManager, Database, MemoryStorage,
+                      ShardedStorage, open_storage)
+from task_cache import CachedDatabase
+
+
+@pytest.mark.parametrize("database_class", [Database, CachedDatabase])
+def test_keyset_paging_by_pomodoros(database_class):
+    db = database_class(storage=MemoryStorage())
+    rng = random.Random(7)
+    db.add_tasks(1, ((f"task {i}", i % 3 == 0, rng.randrange(4)) for i in range(50)))
+    db.add_task(2, "someone else's")
+    expected = sorted(db.get_user_tasks(1), key=lambda task: (-task.pomodoro_count, task.id))
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = db.get_task_page(1, order='pomodoros', cursor=cursor, limit=7)
+        seen.extend(page)
+        if cursor is None:
+            break
+        assert cursor == (page[-1].pomodoro_count, page[-1].id)
+    assert seen == expected
+
+    active = []
+    cursor = None
+    while True:
+        page, cursor = db.get_task_page(1, status='active', order='pomodoros', cursor=cursor, limit=4)
+        active.extend(page)
+        if cursor is None:
+            break
+    assert active == [task for task in expected if not task.completed]
+
+
+def test_failed_mutation_releases_the_write_lock(db_path):
+    db = Database(db_path)
+    db.insert_user("alice", b"hash")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.insert_user("alice", b"hash")
+    assert not db.conn.in_transaction
+
+    other = sqlite3.connect(db_path, timeout=0)
+    other.execute("INSERT INTO users (username, password_hash) VALUES ('bob', 'hash')")
+    other.commit()
+    other.close()
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_failed_mutation_is_rolled_back_whole(db_path, write_behind):
+    db = Database(db_path, write_behind=write_behind, flush_interval=60)
+    kept = db.add_task(1, "kept")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.add_tasks(1, [("ok 1", 0, 0), ("ok 2", 0, 0), (None, 0, 0)])
+    db.add_task(1, "after")
+    db.flush()
+
+    other = sqlite3.connect(db_path)
+    titles = [row[0] for row in other.execute("SELECT title FROM tasks ORDER BY id")]
+    other.close()
+    assert titles == ["kept", "after"]
+    assert db.get_user_tasks(1)[0].id == kept
+    db.close()
+
+
+def test_write_behind_commits_in_groups(db_path):
+    db = Database(db_path, write_behind=True, flush_interval=60, flush_threshold=3)
+    other = sqlite3.connect(db_path)
+
+    def visible():
+        return other.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    db.add_task(1, "one")
+    db.add_task(1, "two")
+    assert len(db.get_user_tasks(1)) == 2  # Pending writes are visible here...
+    assert visible() == 0                  # ...but not to other connections
+    db.add_task(1, "three")                # Reaching the threshold commits the group
+    assert visible() == 3
+    db.add_task(1, "four")
+    db.close()
+    assert visible() == 4
+    other.close()
+
+
+@pytest.mark.parametrize("status", [None, 'active'])
+def test_first_task_page_needs_no_sort(status):
+    db = Database(storage=MemoryStorage())
+    sql, params = db.task_query(1, status=status, order='id')
+    plan = " ".join(row[3] for row in db.conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    assert 'USING INDEX' in plan and 'TEMP B-TREE' not in plan
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    path = os.path.join(str(tmp_path), "shards")
+    yield path
+    for name in list(ConnectionManager._connections):
+        if name.startswith(path):
+            ConnectionManager.close(name)
+
+
+def test_sharded_storage_routes_users_and_tasks(shard_dir):
+    db = Database(storage=ShardedStorage(shard_dir, shards=4), write_behind=True, flush_interval=60)
+    alice = db.insert_user("alice", b"hash")
+    bob = db.insert_user("bob", b"hash")
+    alice_task = db.add_task(alice, "alice's")
+    bob_task = db.add_task(bob, "bob's")
+    assert alice_task >> SHARD_ID_BITS == alice % 4
+    assert bob_task >> SHARD_ID_BITS == bob % 4
+
+    db.increment_pomodoro(bob_task)
+    db.complete_task(alice_task)
+    db.close()
+    assert [(task.title, task.completed) for task in db.get_user_tasks(alice)] == [("alice's", True)]
+    assert [(task.title, task.pomodoro_count) for task in db.get_user_tasks(bob)] == [("bob's", 1)]
+
+    # Committed to the shard files, not just pending on their connections
+    shard = sqlite3.connect(os.path.join(shard_dir, f"tasks-{bob % 4:03d}.db"))
+    assert shard.execute("SELECT title FROM tasks").fetchall() == [("bob's",)]
+    shard.close()
+
+
+def test_sharded_storages_on_one_directory_share_a_lock(shard_dir):
+    first = ShardedStorage(shard_dir)
+    second = open_storage(f"sharded:{shard_dir}")
+    assert first.lock is second.lock
+    assert first.for_user(3) is second.for_user(3)
+
+
+def test_migrations_upgrade_an_old_database(db_path, monkeypatch):
+    old = sqlite3.connect(db_path)
+    for statement in MIGRATIONS[1]:
+        old.execute(statement)
+    old.execute("INSERT INTO tasks (user_id, title) VALUES (1, 'Write report')")
+    old.execute('PRAGMA user_version = 1')
+    old.commit()
+    old.close()
+
+    db = Database(db_path)
+    assert db.conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert [task.title for task in db.search_tasks(1, "rep")] == ["Write report"]  # Backfilled
+
+    # A current database runs no DDL; a failing step leaves nothing behind
+    monkeypatch.setitem(MIGRATIONS, SCHEMA_VERSION + 1, [
+        'CREATE TABLE half_done (id INTEGER)',
+        'CREATE TABLE broken (',
+    ])
+    ConnectionManager.migrate(db.conn)
+    monkeypatch.setattr(database, 'SCHEMA_VERSION', SCHEMA_VERSION + 1)
+    with pytest.raises(sqlite3.OperationalError):
+        ConnectionManager.migrate(db.conn)
+    assert db.conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert not db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchall()
+    assert not db.conn.in_transaction
+
+
+def test_session_rollups_and_streaks():
+    db = Database(storage=MemoryStorage())
+    task_id = db.add_task(1, "task")
+
+    def at(day):
+        return datetime.datetime.combine(day, datetime.time(12)).timestamp()
+
+    monday = datetime.date(2026, 10, 12)
+    tuesday, thursday = monday + datetime.timedelta(days=1), monday + datetime.timedelta(days=3)
+    db.add_session(1, "work", 1500, task_id, ended_at=at(monday))
+    db.add_session(1, "break", 300, ended_at=at(monday))
+    db.add_session(1, "work", 1500, task_id, ended_at=at(tuesday))
+    db.add_session(1, "work", 1200, ended_at=at(tuesday))
+    db.add_session(2, "work", 1500, ended_at=at(tuesday))
+
+    assert db.get_day_stats(1, monday) == (1, 1500, 1, 300)
+    assert db.get_day_stats(1, tuesday) == (2, 2700, 0, 0)
+    assert db.get_week_stats(1, thursday) == (3, 4200, 1, 300)
+    assert db.get_task_stats(task_id) == (2, 3000, at(tuesday))
+    assert db.get_streak(1, today=tuesday) == (2, 2)
+    assert db.get_streak(1, today=thursday) == (0, 2)  # Broken by a day without work
+
+    db.add_session(1, "work", 1500, ended_at=at(thursday))
+    db.add_session(1, "work", 1500, ended_at=at(monday))  # A backfill leaves the streak alone
+    assert db.get_streak(1, today=thursday) == (1, 2)
+    assert db.get_day_stats(1, monday) == (2, 3000, 1, 300)
+
+
+def test_search_tasks_by_title_prefixes():
+    db = Database(storage=MemoryStorage())
+    report = db.add_task(1, "Write report")
+    db.add_task(1, "Café réunion")
+    done = db.add_task(1, "Review the report draft")
+    db.add_task(2, "Write report")
+
+    assert [task.id for task in db.search_tasks(1, "wri rep")] == [report]
+    assert {task.id for task in db.search_tasks(1, "report")} == {report, done}
+    assert [task.title for task in db.search_tasks(1, "cafe reu")] == ["Café réunion"]
+    for query in ('"', 'report OR', 'NOT *', 'title:x', ''):
+        db.search_tasks(1, query)  # User input never forms FTS syntax
+
+    db.delete_task(done)
+    db.complete_task(report)
+    assert [(task.id, task.completed) for task in db.search_tasks(1, "report")] == [(report, True)]
+
+
+@pytest.mark.parametrize("database_class", [Database, CachedDatabase])
+def test_finish_session_credits_only_the_users_own_task(database_class):
+    db = database_class(storage=MemoryStorage())
+    own, other = db.add_task(1, "own"), db.add_task(2, "someone else's")
+    db.get_user_tasks(1)  # Loads the cache, if any
+
+    db.finish_session(1, "work", 1500, own)
+    db.finish_session(1, "work", 1500, other)
+    db.finish_session(1, "break", 300, own)
+    assert [task.pomodoro_count for task in db.get_user_tasks(1)] == [1]
+    assert [task.pomodoro_count for task in db.get_user_tasks(2)] == [0]
+    assert db.get_day_stats(1) == (2, 3000, 1, 300)
+    assert db.get_task_stats(own) == (1, 1500, db.get_task_stats(own)[2])
+    assert db.get_task_stats(other) == (0, 0, None)
@@ -0,0 +1,69 @@
+"""
+Behaviour checks for histograms, tracer export and the traced decorator.
+"""
+
+import csv
+import json
+import os
+
+import pytest
+
+from instrumentation import Histogram, Tracer, traced, tracer
+
+
+def test_histogram_percentile_is_bucket_bound_capped_at_max():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    for _ in range(90):
+        histogram.record(3e-6)  # Bucket for under 4 us
+    for _ in range(10):
+        histogram.record(1e-3)  # Bucket for under 1024 us
+    assert histogram.percentile(0.5) == pytest.approx(4e-6)
+    assert histogram.percentile(0.9) == pytest.approx(4e-6)
+    # The bucket bound is past the slowest sample, so max is reported instead
+    assert histogram.percentile(0.95) == pytest.approx(1e-3)
+    summary = histogram.snapshot()
+    assert (summary['count'], summary['min'], summary['max']) == (100, 3e-6, 1e-3)
+
+
+def test_export_writes_json_and_csv(tmp_path):
+    collector = Tracer()
+    collector.enable()
+    collector.record("db.read", 0.002)
+    collector.record("db.read", 0.004)
+    collector.count("cache.hit", 3)
+
+    json_path = os.path.join(str(tmp_path), "trace.json")
+    collector.export(json_path)
+    with open(json_path) as file:
+        exported = json.load(file)
+    assert exported['counters'] == {'cache.hit': 3}
+    assert exported['spans']['db.read']['count'] == 2
+    assert exported['spans']['db.read']['total'] == pytest.approx(0.006)
+
+    csv_path = os.path.join(str(tmp_path), "trace.CSV")
+    collector.export(csv_path)
+    with open(csv_path, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0][:3] == ['kind', 'name', 'count']
+    assert rows[1][:3] == ['span', 'db.read', '2']
+    assert rows[2][:3] == ['counter', 'cache.hit', '3']
+
+
+def test_disabled_tracer_records_nothing():
+    @traced("test.disabled")
+    def work(value):
+        return value * 2
+
+    was_enabled = tracer.enabled
+    tracer.enable(False)
+    try:
+        assert work(21) == 42
+        tracer.count("test.disabled")
+        with tracer.span("test.disabled"):
+            pass
+        snapshot = tracer.snapshot()
+        assert "test.disabled" not in snapshot['spans']
+        assert "test.disabled" not in snapshot['counters']
+    finally:
+        tracer.enable(was_enabled)
@@ -0,0 +1,42 @@
+"""
+Behaviour checks for TaskList, the array-backed list the task cache keeps.
+"""
+
+from models import Task, TaskList
+
+
+def sample():
+    return TaskList.from_rows([
+        (1, "Write report", 0, 2),
+        (4, "write tests", 1, 5),
+        (6, "Review", 0, 5),
+        (9, "Wrap up", 1, 0),
+    ])
+
+
+def test_filter_by_completion_and_prefix():
+    tasks = sample()
+    assert [task.id for task in tasks.filter(completed=False)] == [1, 6]
+    assert [task.id for task in tasks.filter(title_prefix="Wr")] == [1, 9]
+    assert [task.id for task in tasks.filter(title_prefix="wr", fold=str.lower)] == [1, 4, 9]
+    assert [task.id for task in tasks.filter(completed=True, title_prefix="w", fold=str.lower)] == [4, 9]
+    everything = tasks.filter()
+    assert list(everything) == list(tasks) and everything is not tasks
+
+
+def test_sort_by_keeps_ties_in_list_order():
+    tasks = sample()
+    assert [task.id for task in tasks.sort_by('pomodoro_count', reverse=True)] == [4, 6, 1, 9]
+    assert [task.id for task in tasks.sort_by('completed')] == [1, 6, 4, 9]
+
+
+def test_put_replaces_or_inserts_in_id_order():
+    tasks = sample()
+    assert tasks.put(Task(6, "Review again", True, 7)) is False
+    assert tasks.task(2) == Task(6, "Review again", True, 7)
+    assert tasks.put(Task(5, "Inserted")) is True
+    assert tasks.put(Task(12, "Last")) is True
+    assert [task.id for task in tasks] == [1, 4, 5, 6, 9, 12]
+    assert tasks.index_of(5) == 2 and tasks.index_of(7) is None
+    assert tasks.pop(tasks.index_of(5)) == Task(5, "Inserted")
+    assert len(tasks) == 5
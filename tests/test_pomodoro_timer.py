@@ -0,0 +1,89 @@
+"""
+Behaviour checks for PomodoroTimer, driven by a fake clock so no test sleeps,
+and for TimerEventChannel.
+"""
+
+import pytest
+
+from pomodoro_timer import PomodoroTimer, TimerEventChannel
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timer_runs_one_work_break_cycle():
+    clock = FakeClock()
+    timer = PomodoroTimer(clock=clock, after=lambda *args: None)
+    events = []
+    timer.set_callback(lambda seconds, completed=False: events.append((seconds, completed)))
+
+    timer.start()
+    assert timer.tick() == pytest.approx(1.0)
+    assert events[-1] == (25 * 60, False)
+
+    clock.now = 10.5
+    timer.pause()
+    clock.now = 500.0  # Time passing while paused doesn't count
+    assert timer.current_time == 25 * 60 - 10
+    timer.start()
+
+    clock.now = 500.0 + timer.remaining_time() - 0.25
+    assert timer.tick() == pytest.approx(0.25)
+    assert events[-1] == (1, False)
+
+    clock.now += 0.25
+    assert timer.tick() is None
+    assert events[-2:] == [(0, False), (5 * 60, "work")]
+    assert not timer.is_running
+    assert not timer.is_work_session
+    assert timer.current_time == 5 * 60
+
+    timer.start()
+    clock.now += 5 * 60
+    timer.tick()
+    assert events[-1] == (25 * 60, "break")
+    assert timer.is_work_session
+    assert timer.current_time == 25 * 60
+
+
+def test_timer_checkpoint_restore_credits_elapsed_session():
+    clock = FakeClock()
+    timer = PomodoroTimer(clock=clock, after=lambda *args: None)
+    timer.start()
+    clock.now = 100.0
+    saved = timer.checkpoint(now=1000.0)
+    assert saved == (True, 1400.0, 2400.0)
+
+    resumed = PomodoroTimer(clock=clock, after=lambda *args: None)
+    assert resumed.restore(*saved, now=1500.0) is None
+    assert resumed.is_running and resumed.current_time == 900
+
+    late = PomodoroTimer(clock=clock, after=lambda *args: None)
+    assert late.restore(*saved, now=2400.0) == "work"
+    assert not late.is_running and not late.is_work_session
+    assert late.current_time == 5 * 60
+
+
+def test_drain_collapses_tick_runs_and_keeps_completions_in_order():
+    channel = TimerEventChannel()
+    assert channel.drain() == []
+    for event in [(5, False), (4, False), (3, False), (0, True), (300, False), (299, False),
+                  (0, True), (0, True), (1500, False)]:
+        channel.post(*event)
+    # Each run of ticks shrinks to its latest; completions are never merged or dropped
+    assert channel.drain() == [(3, False), (0, True), (299, False), (0, True), (0, True), (1500, False)]
+    assert channel.drain() == []
+
+    # Events drained earlier are never merged with later ones
+    channel.post(2, False)
+    channel.post(1, False)
+    assert channel.drain() == [(1, False)]
+    channel.post(0, True)
+    assert channel.drain() == [(0, True)]
@@ -0,0 +1,78 @@
+"""
+Behaviour checks for TimerService, calling its request handler directly
+instead of going through a socket.
+"""
+
+import asyncio
+import logging
+
+from auth import AuthManager
+from database import Database, MemoryStorage
+from models import User
+from service import TimerService
+
+
+def logged_in(service, user_id, username):
+    auth = AuthManager(service.db, worker=service.worker)
+    auth.current_user = User(user_id, username)
+    return auth
+
+
+def run(service, body):
+    async def main():
+        service.loop = asyncio.get_running_loop()
+        service.epoch = service.now()
+        return await body()
+    try:
+        return asyncio.run(main())
+    finally:
+        service.worker.close()
+
+
+def test_set_task_only_accepts_own_tasks():
+    db = Database(storage=MemoryStorage())
+    alice, bob = db.insert_user("alice", b"hash"), db.insert_user("bob", b"hash")
+    alice_task, bob_task = db.add_task(alice, "alice's"), db.add_task(bob, "bob's")
+    service = TimerService(db)
+
+    async def body():
+        auth = logged_in(service, alice, "alice")
+        replies = []
+        for task_id in (bob_task, "abc", True, 10 ** 30, alice_task):
+            try:
+                replies.append(await service.handle_request(auth, {'cmd': 'set_task', 'task_id': task_id}))
+            except Exception as exc:
+                replies.append({'ok': False, 'error': str(exc)})
+        return replies
+
+    replies = run(service, body)
+    assert [reply['ok'] for reply in replies] == [False, False, False, False, True]
+    assert replies[-1]['task_id'] == alice_task
+
+
+def test_failed_session_write_keeps_the_wheel_running(caplog):
+    db = Database(storage=MemoryStorage())
+    task_id = db.add_task(1, "task")
+    service = TimerService(db, work_time=1)
+
+    def broken(*args):
+        raise RuntimeError("disk full")
+    db.log_session = broken
+
+    async def body():
+        first, second = service.get_timer(1), service.get_timer(2)
+        first.task_id = task_id
+        service.start(1)
+        service.start(2)
+        for _ in range(20):
+            service.wheel.advance()
+        return first, second
+
+    with caplog.at_level(logging.ERROR, logger="service"):
+        first, second = run(service, body)
+    # Both timers moved on to their breaks although every write failed
+    assert not first.is_work_session and first.deadline is None
+    assert not second.is_work_session and second.deadline is None
+    assert "Couldn't record a finished session" in caplog.text
+    # The pomodoro is rolled back with the session it belonged to
+    assert db.get_user_tasks(1)[0].pomodoro_count == 0
@@ -0,0 +1,90 @@
+"""
+Behaviour checks for CachedDatabase: the cached task lists must stay equal
+to what the database holds, whoever wrote to it, and within the budget.
+"""
+
+import sqlite3
+
+from database import Database, MemoryStorage
+from task_cache import CachedDatabase
+
+
+def test_cache_follows_external_writes(db_path):
+    db = CachedDatabase(db_path)
+    ids = [db.add_task(1, f"task {i}") for i in range(5)]
+    assert len(db.get_task_list(1)) == 5
+    token = db.poll_changes(1)
+    assert db.poll_changes(1, token) == token
+
+    other = sqlite3.connect(db_path)
+    other.execute("INSERT INTO tasks (user_id, title) VALUES (1, 'from elsewhere')")
+    other.execute("UPDATE tasks SET pomodoro_count = 3 WHERE id = ?", (ids[1],))
+    other.execute("DELETE FROM tasks WHERE id = ?", (ids[2],))
+    other.commit()
+    other.close()
+
+    assert db.poll_changes(1, token)[1] != token[1]
+    assert list(db.get_task_list(1)) == Database.get_user_tasks(db, 1)
+    titles = [task.title for task in db.get_task_list(1)]
+    assert "from elsewhere" in titles and "task 2" not in titles
+    assert db.get_task_page(1, order='pomodoros', limit=1)[0][0].id == ids[1]
+
+    # Local writes keep the cache in step too, without a re-sync
+    db.complete_task(ids[0])
+    db.delete_task(ids[3])
+    db.add_task(1, "local")
+    assert db.synced_version == db.change_token()
+    assert list(db.get_task_list(1)) == Database.get_user_tasks(db, 1)
+
+    # A write by another Database on the same connection is still noticed
+    Database(db_path).increment_pomodoro(ids[4])
+    assert db.synced_version != db.change_token()
+    assert list(db.get_task_list(1)) == Database.get_user_tasks(db, 1)
+
+
+def test_pages_come_from_sql_until_the_user_is_loaded():
+    db = CachedDatabase(storage=MemoryStorage())
+    db.add_tasks(1, ((f"task {i}", 0, 0) for i in range(10)))
+    page, cursor = db.get_task_page(1, limit=3)
+    assert [task.title for task in page] == ["task 0", "task 1", "task 2"]
+    assert db.cache_stats() == {'hits': 0, 'misses': 1, 'users': 0, 'rows': 0}
+
+    assert db.preload(1)
+    assert db.get_task_page(1, cursor=cursor, limit=3)[0] == Database.get_task_page(db, 1, cursor=cursor, limit=3)[0]
+    assert db.cache_stats() == {'hits': 1, 'misses': 2, 'users': 1, 'rows': 10}
+
+
+def test_least_recently_used_users_are_evicted():
+    db = CachedDatabase(storage=MemoryStorage(), max_users=2, max_rows=9)
+    for user_id, count in ((1, 3), (2, 3), (3, 6)):
+        db.add_tasks(user_id, ((f"task {i}", 0, 0) for i in range(count)))
+
+    db.get_task_list(1)
+    db.get_task_list(2)
+    db.get_task_list(1)  # Now user 2 is the least recently used
+    db.get_task_list(3)  # Over max_users: user 2 goes
+    assert list(db.cache) == [1, 3]
+    db.add_task(3, "one more")  # Over max_rows: user 1 goes
+    assert list(db.cache) == [3]
+    assert db.cache_stats() == {'hits': 1, 'misses': 3, 'users': 1, 'rows': 7}
+
+
+def test_users_too_big_to_cache_are_not_read_again_until_they_change(db_path, monkeypatch):
+    db = CachedDatabase(db_path, max_rows=5)
+    db.add_tasks(1, ((f"task {i}", 0, 0) for i in range(8)))
+    reads = []
+    read_list = Database.get_task_list
+    monkeypatch.setattr(Database, 'get_task_list',
+                        lambda self, *args, **kwargs: reads.append(args) or read_list(self, *args, **kwargs))
+
+    assert len(db.get_task_list(1)) == 8
+    assert len(db.get_user_tasks(1)) == 8
+    assert len(reads) == 2  # The probe, then the direct read; get_user_tasks doesn't probe again
+    assert db.oversized and not db.cache
+
+    other = sqlite3.connect(db_path)
+    other.execute("DELETE FROM tasks WHERE id > 3")
+    other.commit()
+    other.close()
+    assert len(db.get_task_list(1)) == 3
+    assert not db.oversized and len(db.cache[1]) == 3
@@ -0,0 +1,52 @@
+"""
+Behaviour checks for task import and export.
+"""
+
+import json
+import os
+
+import pytest
+
+import task_io
+from database import Database, MemoryStorage
+from task_io import export_tasks, import_tasks
+
+
+def test_import_csv_with_byte_order_mark(tmp_path):
+    path = os.path.join(str(tmp_path), "excel.csv")
+    with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+        file.write("title,completed,pomodoro_count\r\nWrite report,1,2\r\n")
+    db = Database(storage=MemoryStorage())
+    assert import_tasks(db, 1, path) == 1
+    task, = db.get_user_tasks(1)
+    assert (task.title, task.completed, task.pomodoro_count) == ("Write report", True, 2)
+
+
+def test_json_is_a_real_array_both_ways(tmp_path, monkeypatch):
+    db = Database(storage=MemoryStorage())
+    db.add_tasks(1, [("Plain", 0, 0), ('Quote " and, comma ]', 1, 3), ("Caf\u00e9", 0, 1)])
+    path = os.path.join(str(tmp_path), "tasks.json")
+    assert export_tasks(db, 1, path) == 3
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    assert [record['title'] for record in records] == ["Plain", 'Quote " and, comma ]', "Caf\u00e9"]
+
+    # Tiny chunks split objects and separators across reads
+    monkeypatch.setattr(task_io, 'READ_CHUNK_SIZE', 3)
+    assert import_tasks(db, 2, path) == 3
+    assert [(t.title, t.completed, t.pomodoro_count) for t in db.get_user_tasks(2)] == \
+           [(t.title, t.completed, t.pomodoro_count) for t in db.get_user_tasks(1)]
+
+
+def test_json_empty_array_and_bad_input(tmp_path):
+    db = Database(storage=MemoryStorage())
+    path = os.path.join(str(tmp_path), "tasks.json")
+    assert export_tasks(db, 1, path) == 0
+    assert import_tasks(db, 1, path) == 0
+
+    for text in ('{"title": "not a list"}', '[{"title": "a"} {"title": "b"}]',
+                 '[{"title": "a"}', '[{"title": "a"}] []', '["a"]'):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        with pytest.raises(ValueError):
+            import_tasks(db, 1, path)
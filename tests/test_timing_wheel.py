@@ -0,0 +1,40 @@
+"""
+Behaviour checks for HierarchicalTimingWheel: firing times across cascades
+and cancellation.
+"""
+
+from timing_wheel import HierarchicalTimingWheel
+
+
+def test_timing_wheel_fires_on_time_across_cascades():
+    wheel = HierarchicalTimingWheel(slots=8, levels=3)
+    fired = []
+    delays = [1, 7, 8, 9, 63, 64, 65, 511, 512, 600, 1000]
+    for delay in delays:
+        wheel.schedule(delay, lambda d: fired.append((d, wheel.current)), delay)
+    assert len(wheel) == len(delays)
+
+    for _ in range(1000):
+        wheel.advance()
+    assert sorted(fired) == [(delay, delay) for delay in delays]
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_cancel_before_and_after_cascade():
+    wheel = HierarchicalTimingWheel(slots=8, levels=3)
+    fired = []
+    far = wheel.schedule(100, fired.append, "far")
+    cascaded = wheel.schedule(100, fired.append, "cascaded")
+    kept = wheel.schedule(100, fired.append, "kept")
+
+    wheel.cancel(far)
+    for _ in range(96):
+        wheel.advance()
+    # By now the remaining timers have cascaded down to the lowest wheel
+    wheel.cancel(cascaded)
+    wheel.cancel(cascaded)  # Cancelling twice is harmless
+    for _ in range(10):
+        wheel.advance()
+    assert fired == ["kept"]
+    assert len(wheel) == 0
+    kept.cancel()  # Cancelling a fired timer is harmless too
@@ -0,0 +1,103 @@
+"""
+Hierarchical timing wheel for scheduling large numbers of timers.
+Starting, cancelling and expiring a timer are O(1); timers further out than
+the lowest wheel covers are cascaded down as time advances.
+"""
+
+
+class TimerHandle:
+    """A scheduled callback; keep it to cancel the timer later."""
+
+    __slots__ = ('expires', 'callback', 'args', 'bucket')
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires  # Tick number at which the timer fires
+        self.callback = callback
+        self.args = args
+        self.bucket = None  # Slot the handle currently sits in
+
+    def cancel(self):
+        """Cancel the timer if it hasn't fired yet."""
+        if self.bucket is not None:
+            self.bucket.discard(self)
+            self.bucket = None
+
+
+class HierarchicalTimingWheel:
+    """Timer wheel with `levels` wheels of `slots` slots each.
+
+    Level 0 slots are one tick wide, level 1 slots are `slots` ticks wide and
+    so on, so the wheel covers slots ** levels ticks before timers start to
+    be re-cascaded. Time only moves through advance(); the caller decides how
+    long a tick is.
+    """
+
+    def __init__(self, slots=64, levels=4):
+        """Create an empty wheel positioned at tick 0."""
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.current = 0  # Last tick processed
+        self.count = 0
+
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) after `delay` ticks (at least one) and return its handle."""
+        handle = TimerHandle(self.current + max(1, int(delay)), callback, args)
+        self.insert(handle)
+        self.count += 1
+        return handle
+
+    def cancel(self, handle):
+        """Cancel a pending timer."""
+        if handle.bucket is not None:
+            handle.cancel()
+            self.count -= 1
+
+    def insert(self, handle):
+        """Place a handle in the slot of the lowest wheel that spans its delay."""
+        delta = handle.expires - self.current
+        level = 0
+        span = self.slots
+        while delta >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        width = span // self.slots
+        bucket = self.wheels[level][(handle.expires // width) % self.slots]
+        bucket.add(handle)
+        handle.bucket = bucket
+
+    def advance(self):
+        """Move forward one tick and fire every timer that expires on it."""
+        self.current += 1
+
+        # Cascade every higher wheel whose slot boundary we just crossed,
+        # highest first so timers can fall through several levels at once
+        boundaries = []
+        width = self.slots
+        for level in range(1, self.levels):
+            if self.current % width:
+                break
+            boundaries.append((level, width))
+            width *= self.slots
+        for level, width in reversed(boundaries):
+            bucket = self.wheels[level][(self.current // width) % self.slots]
+            handles = list(bucket)
+            bucket.clear()
+            for handle in handles:
+                self.insert(handle)
+
+        bucket = self.wheels[0][self.current % self.slots]
+        if not bucket:
+            return 0
+        expired = list(bucket)
+        bucket.clear()
+        for handle in expired:
+            handle.bucket = None
+        self.count -= len(expired)
+        for handle in expired:
+            handle.callback(*handle.args)
+        return len(expired)
+
+    def __len__(self):
+        """Number of pending timers."""
+        return self.count